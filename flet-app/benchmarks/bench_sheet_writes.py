@@ -0,0 +1,98 @@
+"""Cell-write and wall-time regression benchmark for a single generated sheet.
+
+Usage:
+    python benchmarks/bench_sheet_writes.py [--sheets 200] [--max-writes 200]
+
+Exits with status 1 when a sheet needs more cell writes than the budget, so a
+hot-path regression (e.g. a nested day loop in fill_worksheet) fails loudly.
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from openpyxl import Workbook
+from openpyxl.worksheet.worksheet import Worksheet
+from utils.excel_generator import ExcelGenerator
+
+# 4 celdas de cabecera + 6 celdas por día trabajado (31 días como máximo)
+MAX_WRITES_PER_SHEET = 4 + 31 * 6
+
+
+class WriteCounter:
+    """Count cell writes done through Worksheet.cell(value=...) and ws['A1'] = ..."""
+
+    def __init__(self):
+        self.writes = 0
+        self.original_cell = Worksheet.cell
+        self.original_setitem = Worksheet.__setitem__
+
+    def __enter__(self):
+        counter = self
+        original_cell = self.original_cell
+        original_setitem = self.original_setitem
+
+        def cell(ws, row, column, value=None):
+            if value is not None:
+                counter.writes += 1
+            return original_cell(ws, row, column, value)
+
+        def setitem(ws, key, value):
+            counter.writes += 1
+            return original_setitem(ws, key, value)
+
+        Worksheet.cell = cell
+        Worksheet.__setitem__ = setitem
+        return self
+
+    def __exit__(self, *exc):
+        Worksheet.cell = self.original_cell
+        Worksheet.__setitem__ = self.original_setitem
+
+
+def full_month_projects():
+    """Worst case: one worked day for every day of a 31-day month"""
+    return {day: f'P{day:03d}' for day in range(1, 32)}
+
+
+def run(sheets: int):
+    generator = ExcelGenerator()
+    template = generator.template
+    projects_by_day = full_month_projects()
+
+    wb = Workbook()
+    with WriteCounter() as counter:
+        ws = template.render(wb, 'Warmup')
+        writes_before = counter.writes
+        generator.fill_worksheet(ws, 'EMPLEADO PRUEBA', projects_by_day, 10.0, 'Enero', 2025)
+        writes_per_sheet = counter.writes - writes_before
+
+    start = time.perf_counter()
+    for index in range(sheets):
+        ws = template.render(wb, f'Hoja{index}')
+        generator.fill_worksheet(ws, 'EMPLEADO PRUEBA', projects_by_day, 10.0, 'Enero', 2025)
+    elapsed = time.perf_counter() - start
+
+    return writes_per_sheet, elapsed / sheets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sheets', type=int, default=200, help='sheets to render for the timing')
+    parser.add_argument('--max-writes', type=int, default=MAX_WRITES_PER_SHEET, help='cell write budget per sheet')
+    args = parser.parse_args()
+
+    writes_per_sheet, seconds_per_sheet = run(args.sheets)
+    print(f"cell writes per sheet: {writes_per_sheet} (budget {args.max_writes})")
+    print(f"wall time per sheet:   {seconds_per_sheet * 1000:.2f} ms")
+
+    if writes_per_sheet > args.max_writes:
+        print("REGRESSION: fill_worksheet writes more cells than expected")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
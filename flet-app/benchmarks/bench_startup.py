@@ -0,0 +1,74 @@
+"""Cold-start benchmark: launch main.py up to the first rendered page.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5]
+
+Each run starts a fresh interpreter, runs main() against a stub page and stops
+when the first page.add() happens, i.e. before the background warm-up. Exits
+with status 1 when pandas or openpyxl were imported before the first frame.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Módulos que no deben cargarse antes de pintar la primera página
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl')
+
+# Runs inside the fresh interpreter; prints one JSON line at the first page.add()
+CHILD = '''
+import json, os, sys, time
+sys.path.insert(0, {src!r})
+import main
+
+class StubPage:
+    def __init__(self):
+        self.controls = []
+    def add(self, *controls):
+        self.controls.extend(controls)
+        print(json.dumps({{
+            'rendered': time.perf_counter(),
+            'heavy': [name for name in {heavy!r} if name in sys.modules],
+        }}), flush=True)
+        os._exit(0)
+    def update(self):
+        pass
+
+main.main(StubPage())
+'''
+
+
+def run_once() -> dict:
+    code = CHILD.format(src=os.path.abspath(SRC_DIR), heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    elapsed = time.perf_counter() - start
+    result = json.loads(output.strip().splitlines()[-1])
+    return {'seconds': elapsed, 'heavy': result['heavy']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='cold launches to time')
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    times = [run['seconds'] for run in runs]
+    heavy = sorted({name for run in runs for name in run['heavy']})
+
+    print(f"cold start to first page: median {statistics.median(times) * 1000:.0f} ms "
+          f"(min {min(times) * 1000:.0f} ms, max {max(times) * 1000:.0f} ms, {args.runs} runs)")
+    print(f"heavy modules loaded before first page: {', '.join(heavy) or 'none'}")
+
+    if heavy:
+        print("REGRESSION: the first page pays for heavy imports")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""End-to-end benchmark suite over synthetic payroll CSVs.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 10,1000,100000] [--employees N] [--months 12]
+                                     [--backend standard] [--workers N] [--csv-engine auto]
+                                     [--output results.json]
+                                     [--compare previous.json]
+
+For every size a synthetic CSV is generated and each case runs in a fresh
+interpreter, so timings include nothing cached by a previous case and the
+peak memory is the case's own:
+
+    parse               CSV parsing as done by the CSV selector (chunked loader)
+    generate_fresh      generate_excel_files into an empty folder
+    generate_update     regenerating every sheet into the existing files
+    generate_unchanged  an incremental re-run where nothing changed
+
+peak_rss_mb is the peak of the case's own process. With a process pool,
+worker_peak_rss_mb is the largest peak of any worker; the two are not added.
+phases are wall times in the case's process, employee_phases task times
+summed over all employees (so across workers running in parallel).
+
+Results are written as JSON; --compare prints the time ratio against an
+earlier results file so regressions across versions are easy to spot.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+
+# Add the src directory to the Python path
+sys.path.append(SRC_DIR)
+sys.path.append(BENCH_DIR)
+
+from synthetic_csv import write_synthetic_csv
+
+CASES = ('parse', 'generate_fresh', 'generate_update', 'generate_unchanged')
+
+
+def run_case(case: str, csv_path: str, output_folder: str, backend: str, workers, csv_engine: str = 'auto') -> dict:
+    """Run one case in this process and return its measurements"""
+    from utils.csv_loader import CSVChunkLoader, iter_csv_records
+    from utils.instrumentation import peak_rss_mb
+    from utils.records import tune_gc
+
+    tune_gc()  # como main.py y cli.py
+
+    if case == 'parse':
+        start = time.perf_counter()
+        loader = CSVChunkLoader(csv_path, engine=csv_engine)
+        rows = sum(len(chunk) for chunk in loader)
+        seconds = time.perf_counter() - start
+        return {'seconds': seconds, 'rows': rows, 'engine': loader.engine, 'peak_rss_mb': peak_rss_mb()}
+
+    from utils.excel_generator import ExcelGenerator
+
+    records = list(iter_csv_records(csv_path, engine=csv_engine))
+    generator = ExcelGenerator(backend=backend)
+    generator.warm_up()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        files = generator.generate_excel_files(
+            records, output_folder, 10.0, workers=workers,
+            incremental=(case == 'generate_unchanged')
+        )
+    seconds = time.perf_counter() - start
+
+    return {
+        'seconds': seconds,
+        'files': len(files),
+        'errors': len(generator.errors),
+        'sheets_skipped': generator.skipped_sheets,
+        'bytes_written': generator.last_report['bytes_written'],
+        'phases': generator.last_report['phases'],
+        'employee_phases': generator.last_report['employee_phases'],
+        'peak_rss_mb': peak_rss_mb(),
+        'worker_peak_rss_mb': generator.last_report['worker_peak_rss_mb'],
+    }
+
+
+def run_case_subprocess(case: str, csv_path: str, output_folder: str, backend: str, workers, csv_engine: str) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), '--run-case', case, '--csv', csv_path,
+               '--output-folder', output_folder, '--backend', backend, '--csv-engine', csv_engine]
+    if workers is not None:
+        command += ['--workers', str(workers)]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results: dict, previous_path: str):
+    """Print the time ratio of every case against an earlier results file"""
+    with open(previous_path, 'r', encoding='utf-8') as file:
+        previous = json.load(file)
+
+    before = {(run['rows'], run['case']): run['seconds'] for run in previous.get('runs', [])}
+    print(f"\ncompared with {previous.get('revision', '?')} ({previous_path}):")
+    for run in results['runs']:
+        old = before.get((run['rows'], run['case']))
+        if old:
+            print(f"  {run['rows']:>9} rows  {run['case']:<20} {run['seconds'] / old:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,1000,100000', help='comma separated row counts (e.g. 10,1000,100000,1000000)')
+    parser.add_argument('--employees', type=int, default=None, help='employees per CSV (default: rows / 250)')
+    parser.add_argument('--months', type=int, default=12, help='months covered by each CSV')
+    parser.add_argument('--backend', default='standard')
+    parser.add_argument('--workers', type=int, default=None, help='process pool size (default: one per core)')
+    parser.add_argument('--csv-engine', default='auto', help='CSV reader: auto, stdlib, pandas or pyarrow')
+    parser.add_argument('--cases', default=','.join(CASES))
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'bench_results.json'))
+    parser.add_argument('--compare', default=None, help='earlier results file to compare against')
+    # Uso interno: ejecutar un único caso en este proceso
+    parser.add_argument('--run-case', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--csv', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--output-folder', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.csv, args.output_folder, args.backend, args.workers,
+                                  args.csv_engine)))
+        return
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    cases = [case for case in CASES if case in args.cases.split(',')]
+    results = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'backend': args.backend,
+        'workers': args.workers,
+        'csv_engine': args.csv_engine,
+        'months': args.months,
+        'runs': [],
+    }
+
+    for rows in sizes:
+        with tempfile.TemporaryDirectory(prefix='bench_suite_') as folder:
+            csv_path = os.path.join(folder, 'synthetic.csv')
+            output_folder = os.path.join(folder, 'output')
+            os.makedirs(output_folder)
+            shape = write_synthetic_csv(csv_path, rows, args.employees, args.months)
+
+            for case in cases:
+                run = run_case_subprocess(case, csv_path, output_folder, args.backend, args.workers, args.csv_engine)
+                run.update({'case': case, 'rows': rows, 'employees': shape['employees']})
+                results['runs'].append(run)
+                workers_peak = f"  workers {run['worker_peak_rss_mb']} MB" if run.get('worker_peak_rss_mb') else ''
+                print(f"{rows:>9} rows  {case:<20} {run['seconds']:9.3f} s  peak {run['peak_rss_mb']} MB{workers_peak}")
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
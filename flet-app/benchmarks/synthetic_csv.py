@@ -0,0 +1,103 @@
+"""Synthetic payroll CSV generator in the nombre,proyecto,fecha format.
+
+Usage:
+    python benchmarks/synthetic_csv.py out.csv --rows 100000 [--employees 400] [--months 12]
+
+Rows are spread evenly over employees and months; each employee month gets
+consecutive working days (Monday to Friday), wrapping around when a month
+has more rows than working days, like a CSV with corrections appended.
+"""
+import argparse
+import calendar
+import csv
+import random
+from datetime import date
+from typing import List, Optional
+
+# Filas por empleado y año aproximadas de un CSV real (≈ 21 días laborables × 12 meses)
+ROWS_PER_EMPLOYEE = 250
+
+FIRST_NAMES = ['ANA', 'JUAN', 'MARIA', 'JOSE', 'LAURA', 'PEDRO', 'CARMEN', 'LUIS', 'ELENA', 'JAVIER']
+LAST_NAMES = ['GARCIA', 'MARTINEZ', 'LOPEZ', 'SANCHEZ', 'PEREZ', 'GOMEZ', 'RUIZ', 'DIAZ', 'MORENO', 'ALVAREZ']
+SITES = ['Obra Norte', 'Obra Sur', 'Nave Industrial', 'Puerto', 'Autovía A-6', 'Hospital', 'Colegio', 'Estación']
+
+
+def default_employees(rows: int) -> int:
+    return max(1, rows // ROWS_PER_EMPLOYEE)
+
+
+def employee_names(count: int) -> List[str]:
+    """Unique, realistic-looking employee names"""
+    names = []
+    for index in range(count):
+        first = FIRST_NAMES[index % len(FIRST_NAMES)]
+        last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+        names.append(f"{first} {last} {index:05d}")
+    return names
+
+
+def month_span(months: int, start_year: int, start_month: int = 1) -> List[tuple]:
+    span = []
+    year, month = start_year, start_month
+    for _ in range(months):
+        span.append((year, month))
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return span
+
+
+def working_days(year: int, month: int) -> List[int]:
+    return [
+        day for day in range(1, calendar.monthrange(year, month)[1] + 1)
+        if date(year, month, day).weekday() < 5
+    ]
+
+
+def write_synthetic_csv(path: str, rows: int, employees: Optional[int] = None, months: int = 12,
+                        start_year: int = 2025, projects: int = 50, seed: int = 1234) -> dict:
+    """Write a CSV with exactly `rows` records and return its shape"""
+    employees = employees or default_employees(rows)
+    rng = random.Random(seed)
+    names = employee_names(employees)
+    span = month_span(months, start_year)
+    days_by_month = {key: working_days(*key) for key in span}
+    project_names = [
+        f"{code:04d} - {SITES[code % len(SITES)]} {code}" for code in range(1, projects + 1)
+    ]
+
+    slices = employees * len(span)
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['nombre', 'proyecto', 'fecha'])
+        written = 0
+        for index in range(slices):
+            # Reparto uniforme: los primeros cortes reciben una fila más si no es exacto
+            count = rows // slices + (1 if index < rows % slices else 0)
+            name = names[index // len(span)]
+            year, month = span[index % len(span)]
+            days = days_by_month[(year, month)]
+            for position in range(count):
+                day = days[position % len(days)]
+                writer.writerow([name, rng.choice(project_names), f"{day:02d}/{month:02d}/{year}"])
+            written += count
+
+    return {'path': path, 'rows': written, 'employees': employees, 'months': len(span)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='CSV file to write')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--employees', type=int, default=None, help=f'default: rows / {ROWS_PER_EMPLOYEE}')
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--start-year', type=int, default=2025)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    shape = write_synthetic_csv(args.path, args.rows, args.employees, args.months, args.start_year, seed=args.seed)
+    print(f"{shape['rows']} rows, {shape['employees']} employees, {shape['months']} months -> {shape['path']}")
+
+
+if __name__ == '__main__':
+    main()
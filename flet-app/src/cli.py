@@ -0,0 +1,209 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+# Add the src directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.csv_engines import ENGINE_NAMES
+from utils.excel_generator import BACKENDS
+from utils.file_writer import DEFAULT_FSYNC, FSYNC_MODES
+
+# Sin flet: este punto de entrada debe arrancar rápido en un servidor
+
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """Resolve file paths and glob patterns into a sorted list of unique files"""
+    files = {}
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if os.path.isfile(path):
+                files.setdefault(os.path.realpath(path), path)
+    return [files[key] for key in sorted(files)]
+
+
+def parse_column_mapping(value: str) -> Dict[str, str]:
+    """'nombre=Empleado,fecha=Día' -> {'nombre': 'Empleado', 'fecha': 'Día'}"""
+    from utils.csv_loader import EXPECTED_HEADERS
+
+    mapping = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        field, sep, header = item.partition('=')
+        if not sep or field.strip() not in EXPECTED_HEADERS:
+            raise argparse.ArgumentTypeError(
+                f"'{item}' no es válido: use campo=columna con campo en {', '.join(EXPECTED_HEADERS)}"
+            )
+        mapping[field.strip()] = header.strip()
+    return mapping
+
+
+def read_csv_file(csv_file: str, cache=None, engine: str = 'auto', sheet: str = None,
+                  columns: Dict[str, str] = None) -> list:
+    """Parsed records of one CSV or .xlsx, served from the on-disk cache when the file is unchanged"""
+    from utils.csv_loader import open_source
+
+    # La caché guarda la lectura por defecto; con una hoja o columnas elegidas a mano se relee
+    if sheet or columns:
+        cache = None
+    if cache is not None:
+        cached = cache.load(csv_file)
+        if cached is not None:
+            return cached
+
+    loader = open_source(csv_file, engine=engine, sheet=sheet, columns=columns)
+    records = [record for chunk in loader for record in chunk]
+    if cache is not None:
+        try:
+            cache.store(csv_file, records, loader.content_hash)
+        except Exception as e:
+            print(f"No se pudo guardar la caché CSV: {e}", file=sys.stderr)
+    return records
+
+
+def load_batch(csv_files: List[str], use_cache: bool = True, engine: str = 'auto', sheet: str = None,
+               columns: Dict[str, str] = None) -> Dict:
+    """Read every CSV or .xlsx into one batch, dropping records repeated within or across files"""
+    from utils.csv_cache import CSVCache
+
+    cache = CSVCache() if use_cache else None
+    records = []
+    seen = set()
+    duplicates = 0
+    file_errors = []
+
+    for csv_file in csv_files:
+        try:
+            # Los registros son tuplas: sirven directamente como clave
+            for record in read_csv_file(csv_file, cache, engine, sheet, columns):
+                if record in seen:
+                    duplicates += 1
+                    continue
+                seen.add(record)
+                records.append(record)
+        except Exception as e:
+            file_errors.append({'file': csv_file, 'error': str(e)})
+
+    return {'records': records, 'duplicates': duplicates, 'file_errors': file_errors}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Genera los Excel de gastos por empleado a partir de uno o varios CSV o .xlsx (nombre, proyecto, fecha)."
+    )
+    parser.add_argument('inputs', nargs='+', help="Archivos CSV o .xlsx o patrones glob (p. ej. 'datos/*.csv')")
+    parser.add_argument('-o', '--output', required=True, help="Carpeta de destino")
+    parser.add_argument('-d', '--dieta', type=float, default=0.00, help="Cantidad por dieta en euros (por defecto 0.00)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Procesos en paralelo (por defecto uno por núcleo)")
+    parser.add_argument('--backend', default='standard', choices=BACKENDS,
+                        help="Backend de escritura: standard (por defecto) o streaming")
+    parser.add_argument('--template', default=None, help="Plantilla .xlsx opcional para la hoja mensual")
+    parser.add_argument('--full', action='store_true', help="Regenerar todas las hojas aunque no hayan cambiado")
+    parser.add_argument('--consolidated', action='store_true',
+                        help="Un único libro por mes con una hoja por empleado y una hoja de resumen")
+    parser.add_argument('--no-cache', action='store_true', help="No usar la caché de CSV ya leídos")
+    parser.add_argument('--csv-engine', default='auto', choices=ENGINE_NAMES,
+                        help="Lector de CSV: auto (por defecto; pyarrow o pandas en archivos grandes si están instalados), "
+                             "stdlib, pandas o pyarrow")
+    parser.add_argument('--sheet', default=None,
+                        help="Hoja de los .xlsx a leer (por defecto la primera con las columnas nombre, proyecto, fecha)")
+    parser.add_argument('--columns', type=parse_column_mapping, default=None, metavar='CAMPO=COLUMNA,...',
+                        help="Columnas de los .xlsx con otro nombre, p. ej. 'nombre=Empleado,fecha=Día'")
+    parser.add_argument('--profile', metavar='DIR', default=None,
+                        help="Guardar perfiles cProfile/tracemalloc de los empleados más lentos en DIR")
+    parser.add_argument('--fsync', default=DEFAULT_FSYNC, choices=FSYNC_MODES,
+                        help="Forzar la escritura a disco: none, file (cada archivo, por defecto) o full (también la carpeta)")
+    parser.add_argument('--batch-writes', action='store_true',
+                        help="Preparar todos los archivos en local y moverlos al destino al final de la ejecución")
+    parser.add_argument('--max-writes', type=int, default=None,
+                        help="Máximo de archivos escribiéndose a la vez en la carpeta de destino")
+    parser.add_argument('--staging-dir', default=None,
+                        help="Carpeta local donde se preparan los archivos (por defecto la temporal del sistema)")
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    from utils.records import tune_gc
+    tune_gc()
+    started = time.monotonic()
+
+    csv_files = expand_inputs(args.inputs)
+    summary = {
+        'inputs': csv_files,
+        'output_folder': args.output,
+        'dieta_amount': args.dieta,
+    }
+
+    if not csv_files:
+        summary['error'] = "No se encontraron archivos CSV ni .xlsx"
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 2
+
+    parse_started = time.monotonic()
+    batch = load_batch(csv_files, use_cache=not args.no_cache, engine=args.csv_engine,
+                       sheet=args.sheet, columns=args.columns)
+    from utils.dataset import PayrollDataset
+    dataset = PayrollDataset(batch['records'])
+    parse_seconds = time.monotonic() - parse_started
+
+    from utils.excel_generator import ExcelGenerator
+
+    try:
+        generator = ExcelGenerator(
+            template_path=args.template, backend=args.backend, profile_dir=args.profile, fsync=args.fsync,
+            staging_dir=args.staging_dir, batch_writes=args.batch_writes, max_concurrent_writes=args.max_writes
+        )
+    except ValueError as e:
+        summary['error'] = str(e)
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 2
+
+    os.makedirs(args.output, exist_ok=True)
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+
+    # Los mensajes del generador (y de sus procesos) van a stderr; stdout queda solo para el resumen JSON
+    sys.stdout.flush()
+    saved_stdout = os.dup(1)
+    os.dup2(2, 1)
+    try:
+        if args.consolidated:
+            generated_files = generator.generate_consolidated_files(dataset, args.output, args.dieta)
+        else:
+            generated_files = generator.generate_excel_files(
+                dataset,
+                args.output,
+                args.dieta,
+                workers=args.workers,
+                incremental=not args.full
+            )
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved_stdout, 1)
+        os.close(saved_stdout)
+
+    summary.update({
+        'records': len(dataset),
+        'duplicates': batch['duplicates'],
+        'employees': dataset.employee_count,
+        'generated_files': generated_files,
+        'skipped_sheets': generator.skipped_sheets,
+        'file_errors': batch['file_errors'],
+        'errors': [{'employee': name, 'error': error} for name, error in generator.errors],
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+        'parse_seconds': round(parse_seconds, 3),
+        'report': generator.last_report,
+    })
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+    return 1 if batch['file_errors'] or generator.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,30 @@
 import flet as ft
-import csv
+import threading
 from typing import List, Dict, Callable
+from utils.csv_loader import SOURCE_EXTENSIONS, CSVFormatError, open_source
+from utils.csv_cache import CSVCache
+from utils.dataset import PayrollDataset
+from utils.ui_scheduler import request_update
+
+# Filas por página en la tabla de vista previa
+PREVIEW_PAGE_SIZE = 100
 
 class CSVSelectorComponent:
-    def __init__(self, on_file_loaded: Callable[[List[Dict]], None] = None):
+    def __init__(self, on_file_loaded: Callable[[PayrollDataset], None] = None):
         self.on_file_loaded = on_file_loaded
-        self.data = []
+        self.data = PayrollDataset([])
         self.file_picker = None
         self.file_name_text = None
         self.data_table = None
         self.error_text = None
+        self.progress_bar = None
+        self.progress_text = None
+        self.page_text = None
+        self.pagination_row = None
+        self.preview_page = 0
+        self._load_id = 0
+        self.use_cache = True  # reutilizar el resultado de archivos ya cargados
+        self._csv_cache = None
         
     def build(self):
         self.file_picker = ft.FilePicker(
@@ -37,16 +52,54 @@ class CSVSelectorComponent:
             visible=False
         )
         
+        self.progress_bar = ft.ProgressBar(
+            value=0,
+            width=400,
+            visible=False
+        )
+        
+        self.progress_text = ft.Text(
+            "",
+            color=ft.Colors.GREY_600,
+            visible=False
+        )
+        
+        self.page_text = ft.Text("")
+        
+        self.pagination_row = ft.Row([
+            ft.IconButton(
+                icon=ft.Icons.FIRST_PAGE,
+                tooltip="Primera página",
+                on_click=lambda _: self.show_preview_page(0)
+            ),
+            ft.IconButton(
+                icon=ft.Icons.CHEVRON_LEFT,
+                tooltip="Página anterior",
+                on_click=lambda _: self.show_preview_page(self.preview_page - 1)
+            ),
+            self.page_text,
+            ft.IconButton(
+                icon=ft.Icons.CHEVRON_RIGHT,
+                tooltip="Página siguiente",
+                on_click=lambda _: self.show_preview_page(self.preview_page + 1)
+            ),
+            ft.IconButton(
+                icon=ft.Icons.LAST_PAGE,
+                tooltip="Última página",
+                on_click=lambda _: self.show_preview_page(self.page_count() - 1)
+            ),
+        ], visible=False)
+        
         return ft.Column([
             self.file_picker,
             ft.Container(
                 content=ft.Row([
                     ft.ElevatedButton(
-                        "Seleccionar archivo CSV",
+                        "Seleccionar archivo CSV o Excel",
                         icon=ft.Icons.UPLOAD_FILE,
                         on_click=lambda _: self.file_picker.pick_files(
                             allow_multiple=False,
-                            allowed_extensions=["csv"]
+                            allowed_extensions=SOURCE_EXTENSIONS
                         )
                     ),
                     self.file_name_text
@@ -54,6 +107,9 @@ class CSVSelectorComponent:
                 padding=ft.padding.all(10)
             ),
             self.error_text,
+            self.progress_bar,
+            self.progress_text,
+            self.pagination_row,
             ft.Container(
                 content=self.data_table,
                 padding=ft.padding.all(10)
@@ -66,54 +122,143 @@ class CSVSelectorComponent:
             self.file_name_text.value = e.files[0].name
             self.load_csv_data(file_path)
             if hasattr(self, 'page') and self.page:
-                self.page.update()
+                request_update(self.page)
     
     def load_csv_data(self, file_path: str):
+        """Start loading a CSV or .xlsx file on a background thread"""
+        # Cada carga tiene su id; una carga anterior que siga en marcha se descarta
+        self._load_id += 1
+        self.data = PayrollDataset([])
+        self.preview_page = 0
+        self.data_table.rows.clear()
+        self.data_table.visible = False
+        self.pagination_row.visible = False
+        self.error_text.visible = False
+        self.progress_bar.value = 0
+        self.progress_bar.visible = True
+        self.progress_text.value = "Cargando archivo..."
+        self.progress_text.visible = True
+        
+        threading.Thread(
+            target=self._load_in_background,
+            args=(file_path, self._load_id),
+            daemon=True
+        ).start()
+    
+    @property
+    def csv_cache(self) -> CSVCache:
+        if self._csv_cache is None:
+            self._csv_cache = CSVCache()
+        return self._csv_cache
+    
+    def _load_in_background(self, file_path: str, load_id: int):
+        """Parse the file chunk by chunk, reporting progress to the page"""
         try:
-            self.data = []
-            self.data_table.rows.clear()
+            cached = self.csv_cache.load(file_path) if self.use_cache else None
+            if cached is not None:
+                if load_id != self._load_id:
+                    return
+                self.data_table.rows = [self.build_preview_row(row) for row in cached[:PREVIEW_PAGE_SIZE]]
+                self._finish_load(cached, cached=True)
+                return
             
-            with open(file_path, 'r', encoding='utf-8') as file:
-                csv_reader = csv.DictReader(file)
-                
-                # Verify headers
-                expected_headers = ['nombre', 'proyecto', 'fecha']
-                if not all(header in csv_reader.fieldnames for header in expected_headers):
-                    self.show_error("El archivo CSV debe tener las columnas: nombre, proyecto, fecha")
+            loader = open_source(file_path)
+            data = []
+            
+            for chunk in loader:
+                if load_id != self._load_id:
                     return
                 
-                # Load data
-                for row in csv_reader:
-                    self.data.append({
-                        'nombre': row['nombre'],
-                        'proyecto': row['proyecto'],
-                        'fecha': row['fecha']
-                    })
-                    
-                    self.data_table.rows.append(
-                        ft.DataRow(cells=[
-                            ft.DataCell(ft.Text(row['nombre'])),
-                            ft.DataCell(ft.Text(row['proyecto'][:50] + "..." if len(row['proyecto']) > 50 else row['proyecto'])),
-                            ft.DataCell(ft.Text(row['fecha']))
-                        ])
-                    )
+                data.extend(chunk)
                 
-                self.data_table.visible = True
-                self.error_text.visible = False
+                # Preview only the first page; the rest stays as plain records
+                for row in chunk[:PREVIEW_PAGE_SIZE - len(self.data_table.rows)]:
+                    self.data_table.rows.append(self.build_preview_row(row))
                 
-                # Notify parent component
-                if self.on_file_loaded:
-                    self.on_file_loaded(self.data)
-                    
+                # Sin progreso conocido (libros que no declaran su tamaño) la barra queda indeterminada
+                progress = loader.progress
+                self.progress_bar.value = progress
+                self.progress_text.value = f"Cargando... {loader.rows_read} registros" + (
+                    f" ({progress:.0%})" if progress is not None else ""
+                )
+                if hasattr(self, 'page') and self.page:
+                    request_update(self.page)
+            
+            if load_id != self._load_id:
+                return
+            
+            self._finish_load(data)
+            
+            if self.use_cache:
+                try:
+                    self.csv_cache.store(file_path, data, loader.content_hash)
+                except Exception as ex:
+                    # La caché es opcional: un fallo no impide usar los datos
+                    print(f"No se pudo guardar la caché CSV: {ex}")
+                
+        except CSVFormatError as ex:
+            self.progress_bar.visible = False
+            self.progress_text.visible = False
+            self.show_error(str(ex))
         except Exception as ex:
+            self.progress_bar.visible = False
+            self.progress_text.visible = False
             self.show_error(f"Error al cargar el archivo: {str(ex)}")
     
+    def _finish_load(self, data: List[Dict], cached: bool = False):
+        """Index the loaded records once and hand the dataset to the parent component"""
+        self.data = PayrollDataset(data)
+        self.data_table.visible = True
+        self.error_text.visible = False
+        self.progress_bar.visible = False
+        self.progress_text.value = f"{len(self.data)} registros en total" + (" (desde caché)" if cached else "")
+        self.progress_text.visible = True
+        self.pagination_row.visible = len(self.data) > PREVIEW_PAGE_SIZE
+        self.update_page_text()
+        
+        # Notify parent component
+        if self.on_file_loaded:
+            self.on_file_loaded(self.data)
+        
+        if hasattr(self, 'page') and self.page:
+            request_update(self.page)
+    
+    def page_count(self) -> int:
+        return max(1, -(-len(self.data) // PREVIEW_PAGE_SIZE))
+    
+    def show_preview_page(self, page_index: int):
+        """Render only the requested page of the preview table"""
+        page_index = max(0, min(page_index, self.page_count() - 1))
+        self.preview_page = page_index
+        
+        start = page_index * PREVIEW_PAGE_SIZE
+        self.data_table.rows = [
+            self.build_preview_row(row) for row in self.data[start:start + PREVIEW_PAGE_SIZE]
+        ]
+        self.update_page_text()
+        
+        if hasattr(self, 'page') and self.page:
+            request_update(self.page)
+    
+    def update_page_text(self):
+        start = self.preview_page * PREVIEW_PAGE_SIZE
+        end = min(start + PREVIEW_PAGE_SIZE, len(self.data))
+        self.page_text.value = f"Filas {start + 1}-{end} de {len(self.data)} (página {self.preview_page + 1} de {self.page_count()})"
+    
+    def build_preview_row(self, row: Dict) -> ft.DataRow:
+        return ft.DataRow(cells=[
+            ft.DataCell(ft.Text(row['nombre'])),
+            ft.DataCell(ft.Text(row['proyecto'][:50] + "..." if len(row['proyecto']) > 50 else row['proyecto'])),
+            ft.DataCell(ft.Text(row['fecha']))
+        ])
+    
     def show_error(self, message: str):
         self.error_text.value = message
         self.error_text.visible = True
         self.data_table.visible = False
+        self.pagination_row.visible = False
         if hasattr(self, 'page') and self.page:
-            self.page.update()
+            request_update(self.page)
     
     def set_page(self, page):
         self.page = page
\ No newline at end of file
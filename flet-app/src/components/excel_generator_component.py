@@ -1,14 +1,48 @@
 import flet as ft
 import os
+import threading
+import time
+from typing import Optional
+from utils.dataset import PayrollDataset
 from utils.excel_generator import ExcelGenerator
+from utils.instrumentation import format_report
+from utils.ui_scheduler import Debouncer, FolderStatusCache, request_update
+from utils.web_downloads import new_download
 
 class ExcelGeneratorUI:
-    def __init__(self, csv_data: list = None):
-        self.csv_data = csv_data or []
-        self.excel_generator = ExcelGenerator()
+    def __init__(self, csv_data: PayrollDataset = None):
+        self.csv_data = csv_data if csv_data is not None else PayrollDataset([])
+        self._excel_generator = None  # se crea al primer uso
         self.output_folder = ""
         self.dieta_amount = 0.00
+        # Un solo proceso por defecto: el pool (workers > 1, o None = uno por núcleo) es opcional,
+        # porque en un ejecutable empaquetado cada proceso hijo volvería a lanzar la interfaz
+        self.workers = 1
+        self.show_report = True  # mostrar los tiempos de la última generación
+        self.consolidated = False  # un único archivo por mes con todos los empleados
+        self.cancel_event = threading.Event()
+        self.is_generating = False
+        # La carpeta se valida en segundo plano cuando se deja de escribir
+        self.folder_check = Debouncer(self._check_folder)
+        self.folder_status = FolderStatusCache()
         
+    @property
+    def excel_generator(self) -> ExcelGenerator:
+        if self._excel_generator is None:
+            self._excel_generator = ExcelGenerator()
+        return self._excel_generator
+    
+    def warm_up(self):
+        """Load openpyxl and the sheet template in the background once the window is up"""
+        threading.Thread(target=self._warm_up_in_background, daemon=True).start()
+    
+    def _warm_up_in_background(self):
+        try:
+            self.excel_generator.warm_up()
+        except Exception as ex:
+            # No es crítico: la primera generación volverá a intentarlo
+            print(f"Warm-up failed: {ex}")
+    
     def build(self):
         self.folder_picker = ft.FilePicker(
             on_result=self.on_folder_selected
@@ -35,6 +69,12 @@ class ExcelGeneratorUI:
             on_change=self.on_dieta_change
         )
         
+        self.consolidated_checkbox = ft.Checkbox(
+            label="Un único archivo por mes (todos los empleados + resumen)",
+            value=self.consolidated,
+            on_change=self.on_consolidated_change
+        )
+        
         self.generate_button = ft.ElevatedButton(
             "Generar archivos Excel",
             icon=ft.Icons.DESCRIPTION,
@@ -42,6 +82,34 @@ class ExcelGeneratorUI:
             disabled=False
         )
         
+        self.cancel_button = ft.OutlinedButton(
+            "Cancelar",
+            icon=ft.Icons.CANCEL,
+            on_click=self.cancel_generation,
+            visible=False
+        )
+        
+        self.progress_bar = ft.ProgressBar(
+            width=400,
+            value=0,
+            visible=False
+        )
+        
+        self.progress_text = ft.Text(
+            "",
+            size=12,
+            color=ft.Colors.GREY_600,
+            visible=False
+        )
+        
+        self.report_text = ft.Text(
+            "",
+            size=11,
+            color=ft.Colors.GREY_600,
+            selectable=True,
+            visible=False
+        )
+        
         self.status_text = ft.Text(
             "",
             color=ft.Colors.GREEN,
@@ -54,6 +122,24 @@ class ExcelGeneratorUI:
             visible=False
         )
         
+        self.folder_buttons = ft.Row([
+            ft.ElevatedButton(
+                "Explorar carpeta",
+                icon=ft.Icons.FOLDER,
+                on_click=self.on_folder_button_click
+            ),
+            ft.ElevatedButton(
+                "Usar Descargas",
+                icon=ft.Icons.DOWNLOAD,
+                on_click=self.use_downloads_folder
+            )
+        ])
+        
+        self.folder_input_container = ft.Container(
+            content=self.folder_input,
+            padding=ft.padding.symmetric(vertical=10)
+        )
+        
         return ft.Column([
             self.folder_picker,
             ft.Text(
@@ -62,32 +148,25 @@ class ExcelGeneratorUI:
                 weight=ft.FontWeight.BOLD
             ),
             ft.Divider(),
-            ft.Row([
-                ft.ElevatedButton(
-                    "Explorar carpeta",
-                    icon=ft.Icons.FOLDER,
-                    on_click=self.on_folder_button_click
-                ),
-                ft.ElevatedButton(
-                    "Usar Descargas",
-                    icon=ft.Icons.DOWNLOAD,
-                    on_click=self.use_downloads_folder
-                )
-            ]),
-            ft.Container(
-                content=self.folder_input,
-                padding=ft.padding.symmetric(vertical=10)
-            ),
+            self.folder_buttons,
+            self.folder_input_container,
             self.folder_text,
             ft.Container(
                 content=self.dieta_input,
                 padding=ft.padding.all(10)
             ),
             ft.Container(
-                content=self.generate_button,
+                content=self.consolidated_checkbox,
+                padding=ft.padding.symmetric(horizontal=10)
+            ),
+            ft.Container(
+                content=ft.Row([self.generate_button, self.cancel_button]),
                 padding=ft.padding.all(10)
             ),
+            self.progress_bar,
+            self.progress_text,
             self.status_text,
+            self.report_text,
             self.error_text
         ])
     
@@ -101,8 +180,6 @@ class ExcelGeneratorUI:
             self.folder_input.value = downloads_path
             self.output_folder = downloads_path  # AGREGAR ESTA LÍNEA
             self.update_folder_from_input()
-            if hasattr(self, 'page') and self.page:
-                self.page.update()
         else:
             self.show_error("No se encontró la carpeta de Descargas")
     
@@ -119,21 +196,29 @@ class ExcelGeneratorUI:
             self.folder_input.value = e.path
             self.output_folder = e.path  # AGREGAR ESTA LÍNEA
             self.update_folder_from_input()
-            if hasattr(self, 'page') and self.page:
-                self.page.update()
     
     def on_folder_input_change(self, e):
         """Handle manual folder input change"""
         folder_path = e.control.value.strip()
         self.output_folder = folder_path  # AGREGAR ESTA LÍNEA
-        self.update_folder_from_input()
+        # Comprobar la carpeta solo cuando se deja de escribir, y fuera del hilo de la interfaz
+        self.folder_check.call()
+        self.update_generate_button_state()
     
     def update_folder_from_input(self):
-        """Update folder state from input field value"""
+        """Validate the folder field right away, off the UI thread"""
+        self.folder_check.call(delay=0)
+    
+    def _check_folder(self):
+        """Update folder state from input field value (runs on a background thread)"""
         folder_path = self.folder_input.value.strip()
+        is_dir = self.folder_status.is_dir(folder_path) if folder_path else False
+        
+        if folder_path != self.folder_input.value.strip():
+            return  # el campo cambió mientras se comprobaba; ya hay otra comprobación en camino
         
         if folder_path:
-            if os.path.exists(folder_path) and os.path.isdir(folder_path):
+            if is_dir:
                 self.folder_text.value = f"✅ Carpeta válida: {folder_path}"
                 self.folder_text.color = ft.Colors.GREEN
             else:
@@ -147,24 +232,33 @@ class ExcelGeneratorUI:
         self.update_generate_button_state()
         
         if hasattr(self, 'page') and self.page:
-            self.page.update()
+            request_update(self.page)
     
     def on_dieta_change(self, e):
+        # El botón no depende de la dieta: no hace falta redibujar la página
         try:
             self.dieta_amount = float(e.control.value.replace(',', '.'))
         except ValueError:
             self.dieta_amount = 0.00
+    
+    def on_consolidated_change(self, e):
+        self.consolidated = bool(e.control.value)
         self.update_generate_button_state()
     
+    @property
+    def web_mode(self) -> bool:
+        """Running in a browser: the files are downloaded as a ZIP instead of written to a folder"""
+        return bool(getattr(self, 'page', None) and getattr(self.page, 'web', False))
+    
     def update_generate_button_state(self):
         """Update the state of the generate button"""
-        has_folder = bool(self.output_folder.strip()) if self.output_folder else False
+        has_folder = self.web_mode or (bool(self.output_folder.strip()) if self.output_folder else False)
         has_data = bool(self.csv_data)
         
         print(f"Debug - Folder: '{self.output_folder}', Has folder: {has_folder}, Has data: {has_data}")
         
-        # El botón SIEMPRE está activo
-        self.generate_button.disabled = False
+        # El botón está activo salvo mientras hay una generación en curso
+        self.generate_button.disabled = self.is_generating
         
         # Update button text based on state
         if not has_data and not has_folder:
@@ -175,67 +269,210 @@ class ExcelGeneratorUI:
             self.generate_button.text = "Generar archivos Excel (sin carpeta)"
             print(f"Son carpeta pero {has_folder} y {has_data}")
         else:
-            unique_employees = len(set(row['nombre'] for row in self.csv_data)) if self.csv_data else 0
-            self.generate_button.text = f"Generar {unique_employees} archivos Excel"
+            unique_employees = self.csv_data.employee_count
+            if self.web_mode:
+                kind = "consolidado" if self.consolidated else f"con {unique_employees} archivos Excel"
+                self.generate_button.text = f"Descargar ZIP {kind}"
+            elif self.consolidated:
+                self.generate_button.text = f"Generar archivo consolidado ({unique_employees} empleados)"
+            else:
+                self.generate_button.text = f"Generar {unique_employees} archivos Excel"
         
         if hasattr(self, 'page') and self.page:
-            self.page.update()
+            request_update(self.page)
     
     def generate_excel_files(self, e):
-        try:
-            self.hide_messages()
-            
-            if not self.csv_data:
-                self.show_error("⚠️ No hay datos CSV cargados. Carga un archivo CSV primero.")
-                return
-            
+        """Validate the inputs and start the generation on a background thread"""
+        if self.is_generating:
+            return
+        
+        self.hide_messages()
+        
+        if not self.csv_data:
+            self.show_error("⚠️ No hay datos CSV cargados. Carga un archivo CSV primero.")
+            return
+        
+        if not self.web_mode:
             if not self.output_folder:
                 self.show_error("⚠️ No hay carpeta de destino. Selecciona o escribe una carpeta.")
                 return
             
             try:
                 os.makedirs(self.output_folder, exist_ok=True)
+                self.folder_status.invalidate(self.output_folder)
             except Exception as ex:
                 self.show_error(f"❌ No se pudo crear la carpeta: {str(ex)}")
                 return
-            
-            generated_files = self.excel_generator.generate_excel_files(
-                self.csv_data, 
-                self.output_folder, 
-                self.dieta_amount
+        
+        self.is_generating = True
+        self.cancel_event.clear()
+        self.generate_button.disabled = True
+        self.cancel_button.disabled = False
+        self.cancel_button.visible = True
+        self.progress_bar.value = None  # indeterminada hasta el primer archivo
+        self.progress_bar.visible = True
+        self.progress_text.value = "Preparando datos..."
+        self.progress_text.visible = True
+        if hasattr(self, 'page') and self.page:
+            request_update(self.page)
+        
+        threading.Thread(
+            target=self._generate_in_background,
+            args=(self.csv_data, None if self.web_mode else self.output_folder, self.dieta_amount),
+            daemon=True
+        ).start()
+    
+    def _generate_in_background(self, csv_data: PayrollDataset, output_folder: Optional[str], dieta_amount: float):
+        """Run the generator off the UI thread and report the result when it ends
+
+        Without an output folder (web mode) the files are bundled into a ZIP
+        that the browser downloads.
+        """
+        started = time.monotonic()
+        
+        def on_progress(done: int, total: int, employee_name: str):
+            elapsed = time.monotonic() - started
+            remaining = elapsed / done * (total - done) if done else 0
+            self.progress_bar.value = done / total if total else 1
+            self.progress_text.value = (
+                f"{done}/{total} · {employee_name} · "
+                f"transcurrido {self.format_duration(elapsed)} · restante ~{self.format_duration(remaining)}"
             )
+            if hasattr(self, 'page') and self.page:
+                request_update(self.page)
+        
+        try:
+            if output_folder is None:
+                self._download_zip(csv_data, dieta_amount, on_progress, started)
+                return
             
-            if generated_files:
-                self.show_status(f"✅ Se generaron {len(generated_files)} archivos Excel en: {self.output_folder}")
+            if self.consolidated:
+                generated_files = self.excel_generator.generate_consolidated_files(
+                    csv_data,
+                    output_folder,
+                    dieta_amount,
+                    progress_callback=on_progress,
+                    cancel_event=self.cancel_event
+                )
+            else:
+                generated_files = self.excel_generator.generate_excel_files(
+                    csv_data, 
+                    output_folder, 
+                    dieta_amount,
+                    workers=self.workers,
+                    progress_callback=on_progress,
+                    cancel_event=self.cancel_event
+                )
+            
+            errors = self.excel_generator.errors
+            skipped = self.excel_generator.skipped_sheets
+            notes = []
+            if errors:
+                notes.append(f"{len(errors)} con errores")
+            if skipped:
+                notes.append(f"{skipped} hojas sin cambios")
+            notes_text = f" ({', '.join(notes)})" if notes else ""
+            elapsed_text = self.format_duration(time.monotonic() - started)
+            if self.excel_generator.cancelled:
+                self.show_status(f"⏹️ Generación cancelada: {len(generated_files)} archivos completos en: {output_folder}{notes_text}")
+            elif generated_files:
+                self.show_status(f"✅ Se generaron {len(generated_files)} archivos Excel en: {output_folder}{notes_text} en {elapsed_text}")
+            elif skipped and not errors:
+                self.show_status(f"✅ Sin cambios: las {skipped} hojas ya estaban actualizadas en {output_folder}")
             else:
                 self.show_error("❌ No se pudieron generar los archivos")
+            
+            report = self.excel_generator.last_report
+            if report and self.show_report:
+                self.report_text.value = f"⏱️ {format_report(report)}"
+                self.report_text.visible = True
                 
         except Exception as ex:
             self.show_error(f"❌ Error al generar archivos: {str(ex)}")
+        finally:
+            self.is_generating = False
+            self.generate_button.disabled = False
+            self.cancel_button.visible = False
+            self.progress_bar.visible = False
+            self.progress_text.visible = False
+            if hasattr(self, 'page') and self.page:
+                request_update(self.page)
+    
+    def _download_zip(self, csv_data: PayrollDataset, dieta_amount: float, on_progress, started: float):
+        """Stream every workbook into one ZIP served to the browser and open its URL"""
+        zip_name = "GASTOS_CONSOLIDADO.zip" if self.consolidated else "GASTOS.zip"
+        zip_path, url = new_download(zip_name)
+        
+        file_names = self.excel_generator.generate_zip_bundle(
+            csv_data,
+            zip_path,
+            dieta_amount,
+            consolidated=self.consolidated,
+            progress_callback=on_progress,
+            cancel_event=self.cancel_event
+        )
+        
+        errors = self.excel_generator.errors
+        errors_text = f" ({len(errors)} con errores)" if errors else ""
+        elapsed_text = self.format_duration(time.monotonic() - started)
+        if not file_names:
+            self.show_error("❌ No se pudieron generar los archivos")
+            return
+        
+        self.page.launch_url(url)
+        if self.excel_generator.cancelled:
+            self.show_status(f"⏹️ Generación cancelada: ZIP con {len(file_names)} archivos completos{errors_text}")
+        else:
+            self.show_status(f"✅ ZIP con {len(file_names)} archivos Excel listo para descargar{errors_text} en {elapsed_text}")
+        
+        report = self.excel_generator.last_report
+        if report and self.show_report:
+            self.report_text.value = f"⏱️ {format_report(report)}"
+            self.report_text.visible = True
+    
+    def cancel_generation(self, e):
+        """Ask the running generation to stop after the files in progress"""
+        self.cancel_event.set()
+        self.cancel_button.disabled = True
+        self.progress_text.value = "Cancelando tras el archivo en curso..."
+        if hasattr(self, 'page') and self.page:
+            request_update(self.page)
+    
+    @staticmethod
+    def format_duration(seconds: float) -> str:
+        minutes, seconds = divmod(int(round(seconds)), 60)
+        return f"{minutes}:{seconds:02d}"
     
     def show_status(self, message: str):
         self.status_text.value = message
         self.status_text.visible = True
         self.error_text.visible = False
         if hasattr(self, 'page') and self.page:
-            self.page.update()
+            request_update(self.page)
     
     def show_error(self, message: str):
         self.error_text.value = message
         self.error_text.visible = True
         self.status_text.visible = False
         if hasattr(self, 'page') and self.page:
-            self.page.update()
+            request_update(self.page)
     
     def hide_messages(self):
         self.status_text.visible = False
+        self.report_text.visible = False
         self.error_text.visible = False
         if hasattr(self, 'page') and self.page:
-            self.page.update()
+            request_update(self.page)
     
-    def set_csv_data(self, data: list):
-        self.csv_data = data
+    def set_csv_data(self, data: PayrollDataset):
+        self.csv_data = data if isinstance(data, PayrollDataset) else PayrollDataset(data)
         self.update_generate_button_state()
     
     def set_page(self, page):
-        self.page = page
\ No newline at end of file
+        self.page = page
+        if self.web_mode:
+            # En el navegador no hay carpeta del servidor que elegir: los archivos se descargan en un ZIP
+            self.folder_buttons.visible = False
+            self.folder_input_container.visible = False
+            self.folder_text.value = "Los archivos se descargarán en un archivo ZIP"
+            self.update_generate_button_state()
\ No newline at end of file
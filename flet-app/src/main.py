@@ -1,4 +1,5 @@
 import flet as ft
+import multiprocessing
 import sys
 import os
 
@@ -6,6 +7,8 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from views.csv_view import CSVView
+from utils.records import tune_gc
+from utils.web_downloads import ASSETS_DIR
 
 def main(page: ft.Page):
     page.title = "Nova Dietas - CSV Selector"
@@ -15,8 +18,16 @@ def main(page: ft.Page):
     
     # Create and add the CSV view
     csv_view = CSVView()
-    csv_view.set_page(page)
     page.add(csv_view.build())
+    # Después de build(): así los componentes ya existen y reciben la página
+    csv_view.set_page(page)
+    
+    # Cargar openpyxl en segundo plano una vez pintada la ventana
+    csv_view.warm_up()
 
 if __name__ == "__main__":
-    ft.app(target=main)
\ No newline at end of file
+    # Necesario si se activa el pool de procesos en un ejecutable empaquetado (flet pack / flet build)
+    multiprocessing.freeze_support()
+    tune_gc()
+    # En modo web las descargas ZIP se sirven desde assets/descargas
+    ft.app(target=main, assets_dir=ASSETS_DIR)
\ No newline at end of file
@@ -0,0 +1,258 @@
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from utils.csv_loader import EXPECTED_HEADERS, new_content_hash
+from utils.records import Record
+
+CACHE_VERSION = 2
+
+# Tamaño máximo de la caché en disco; al superarlo se borran las entradas usadas hace más tiempo
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+INDEX_NAME = 'index.json'
+LOCK_NAME = 'index.lock'
+
+# Temporales de escritura que un proceso interrumpido dejó atrás se borran pasado este tiempo
+STALE_TEMP_SECONDS = 60 * 60
+
+
+def default_cache_dir() -> str:
+    """Per-user cache folder (XDG_CACHE_HOME, LOCALAPPDATA on Windows, ~/.cache otherwise)"""
+    base = os.environ.get('XDG_CACHE_HOME')
+    if not base and sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA')
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'nova_dietas', 'csv')
+
+
+def file_content_hash(file_path: str) -> str:
+    digest = new_content_hash()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def encode_columns(records: List[Record]) -> Dict:
+    """Dictionary-encode the record columns: each distinct string is stored once"""
+    columns = {}
+    for header, values in zip(EXPECTED_HEADERS, zip(*records) if records else ((), (), ())):
+        codes = {}
+        indices = array('I', (codes.setdefault(value, len(codes)) for value in values))
+        columns[header] = (list(codes), indices)
+    return columns
+
+
+def decode_columns(columns: Dict) -> List[Record]:
+    nombres, proyectos, fechas = (
+        map(uniques.__getitem__, indices)
+        for uniques, indices in (columns[header] for header in EXPECTED_HEADERS)
+    )
+    return list(map(Record._make, zip(nombres, proyectos, fechas)))
+
+
+@contextmanager
+def locked_file(lock_path: str):
+    """Exclusive lock on lock_path shared by every process using the cache (flock, or msvcrt on Windows)"""
+    with open(lock_path, 'a+b') as file:
+        if sys.platform == 'win32':
+            import msvcrt
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == 'win32':
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class CSVCache:
+    """On-disk cache of parsed CSV records
+
+    Entries are keyed by content hash. A file whose path, size and mtime are
+    unchanged is served without being read at all. A touched or copied file is
+    hashed once and matched by content. Once max_bytes is exceeded, the least
+    recently used entries are evicted.
+
+    The GUI and the CLI may share the folder: every index change re-reads the
+    index from disk and applies itself under a lock (threads and processes),
+    so concurrent writers merge instead of overwriting each other. The
+    published self.index is never mutated in place.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(self.cache_dir, INDEX_NAME)
+        self.lock_path = os.path.join(self.cache_dir, LOCK_NAME)
+        self._lock = threading.Lock()
+        self.index = self.read_index()
+
+    def read_index(self) -> Dict:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                index = json.load(file)
+            if index.get('version') == CACHE_VERSION:
+                return index
+        except (OSError, ValueError, AttributeError):
+            pass
+        return {'version': CACHE_VERSION, 'files': {}, 'entries': {}}
+
+    def write_index(self, index: Dict):
+        """Replace the index file; callers hold the lock (see update_index)"""
+        handle, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8') as file:
+                json.dump(index, file)
+            os.replace(temp_path, self.index_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @contextmanager
+    def locked(self):
+        """Hold the cache lock against other threads of this process and other processes"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._lock, locked_file(self.lock_path):
+            yield
+
+    def update_index(self, change: Callable[[Dict], None]):
+        """Apply change to the index as currently on disk, evict if needed and write it back"""
+        with self.locked():
+            index = self.read_index()
+            change(index)
+            self.evict(index)
+            self.write_index(index)
+            self.index = index
+
+    def entry_path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}.pickle")
+
+    @staticmethod
+    def fingerprint(file_path: str) -> Dict:
+        stat = os.stat(file_path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def lookup_hash(self, file_path: str) -> Optional[str]:
+        """Content hash of file_path if the cache may hold it, hashing the file only when needed"""
+        real_path = os.path.realpath(file_path)
+        fingerprint = self.fingerprint(file_path)
+        known = self.index['files'].get(real_path)
+        if known and known['size'] == fingerprint['size'] and known['mtime_ns'] == fingerprint['mtime_ns']:
+            return known['hash']
+
+        # Solo merece la pena leer el archivo si hay alguna entrada del mismo tamaño
+        if not any(entry['source_size'] == fingerprint['size'] for entry in self.index['entries'].values()):
+            return None
+        return file_content_hash(file_path)
+
+    def load(self, file_path: str) -> Optional[List[Record]]:
+        """Return the cached records of file_path, or None on a miss"""
+        try:
+            # Otro proceso puede haber añadido entradas desde la última lectura
+            self.index = self.read_index()
+            content_hash = self.lookup_hash(file_path)
+            if not content_hash or content_hash not in self.index['entries']:
+                return None
+            with open(self.entry_path(content_hash), 'rb') as file:
+                payload = pickle.load(file)
+            if payload.get('version') != CACHE_VERSION:
+                return None
+            records = decode_columns(payload['columns'])
+        except Exception as e:
+            print(f"Caché CSV no disponible para {file_path}: {e}")
+            return None
+
+        try:
+            self.update_index(lambda index: self.remember(index, file_path, content_hash))
+        except Exception as e:
+            # Solo se pierde la fecha de uso: los registros ya están leídos
+            print(f"No se pudo actualizar el índice de la caché CSV: {e}")
+        return records
+
+    def store(self, file_path: str, records: List[Record], content_hash: Optional[str] = None):
+        """Cache the parsed records of file_path; content_hash avoids re-reading the file"""
+        content_hash = content_hash or file_content_hash(file_path)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        payload = {'version': CACHE_VERSION, 'columns': encode_columns(records)}
+        entry_path = self.entry_path(content_hash)
+        handle, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        try:
+            # El volcado, que es lo lento, fuera del lock; la publicación y el índice, dentro
+            with os.fdopen(handle, 'wb') as file:
+                pickle.dump(payload, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+            def add_entry(index: Dict):
+                os.replace(temp_path, entry_path)
+                index['entries'][content_hash] = {
+                    'bytes': os.path.getsize(entry_path),
+                    'source_size': os.path.getsize(file_path),
+                    'last_used': time.time(),
+                }
+                self.remember(index, file_path, content_hash)
+
+            self.update_index(add_entry)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def remember(self, index: Dict, file_path: str, content_hash: str):
+        if content_hash not in index['entries']:
+            return  # otro proceso la ha desalojado entretanto
+        index['files'][os.path.realpath(file_path)] = dict(self.fingerprint(file_path), hash=content_hash)
+        index['entries'][content_hash]['last_used'] = time.time()
+
+    def evict(self, index: Dict):
+        """Delete least recently used entries until the cache fits in max_bytes, plus files no entry owns"""
+        entries = index['entries']
+        total = sum(entry['bytes'] for entry in entries.values())
+        for content_hash in sorted(entries, key=lambda key: entries[key]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= entries.pop(content_hash)['bytes']
+            try:
+                os.remove(self.entry_path(content_hash))
+            except OSError:
+                pass
+
+        # Rutas que apuntaban a entradas borradas
+        index['files'] = {
+            path: known for path, known in index['files'].items() if known['hash'] in entries
+        }
+        self.remove_orphans(entries)
+
+    def remove_orphans(self, entries: Dict):
+        """Delete pickles missing from the index (e.g. dropped by an older, unlocked writer) and stale temp files
+
+        Runs under the lock, and pickles are only published under it, so
+        every pickle not in entries is garbage. Temporary files may still be
+        being written by another process unless they are old.
+        """
+        stale_before = time.time() - STALE_TEMP_SECONDS
+        for entry in os.scandir(self.cache_dir):
+            try:
+                if entry.name.endswith('.pickle'):
+                    if entry.name[:-len('.pickle')] not in entries:
+                        os.remove(entry.path)
+                elif entry.name.endswith('.tmp') and entry.stat().st_mtime < stale_before:
+                    os.remove(entry.path)
+            except OSError:
+                pass
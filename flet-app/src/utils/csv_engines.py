@@ -0,0 +1,221 @@
+import codecs
+import csv
+import importlib.util
+import io
+from typing import BinaryIO, Callable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Bytes leídos al principio del archivo para deducir codificación y separador
+SNIFF_BYTES = 64 * 1024
+
+# Separadores habituales en las exportaciones (Excel en español usa ';')
+DELIMITERS = ',;\t|'
+
+# Codificaciones probadas en orden: UTF-8 (con o sin BOM) y, si no encaja, Windows-1252 / Latin-1
+FALLBACK_ENCODINGS = ('cp1252', 'latin-1')
+
+# Gestor de errores de decodificación: la muestra solo cubre el principio del archivo, así que un
+# archivo Windows-1252 que empieza en ASCII se toma por UTF-8; sus bytes sueltos se leen como cp1252
+DECODE_ERRORS = 'nova_cp1252_fallback'
+
+# Códec UTF-8 con ese mismo respaldo, para lectores que solo aceptan un nombre de codificación (pyarrow)
+UTF8_FALLBACK_CODEC = 'utf_8_cp1252'
+
+# Por debajo de este tamaño el motor en Python puro gana: importar pandas/pyarrow cuesta más que leer
+FAST_ENGINE_MIN_BYTES = 4 * 1024 * 1024
+
+# Filas por lectura de los motores en C: bloques grandes amortizan su coste fijo por bloque
+FAST_ENGINE_BLOCK_ROWS = 100000
+
+# (nombre, proyecto, fecha) values of one chunk, one list per column
+Columns = Tuple[List[str], List[str], List[str]]
+
+
+class CSVDialect(NamedTuple):
+    """Encoding, delimiter and raw header row sniffed from the start of a file"""
+    encoding: str
+    delimiter: str
+    header: List[str]
+
+
+def decode_fallback(error: UnicodeDecodeError) -> Tuple[str, int]:
+    """Decode the bytes UTF-8 rejected as Windows-1252 (Latin-1 for the few bytes cp1252 leaves undefined)"""
+    if not isinstance(error, UnicodeDecodeError):
+        raise error
+    invalid = error.object[error.start:error.end]
+    try:
+        return invalid.decode('cp1252'), error.end
+    except UnicodeDecodeError:
+        return invalid.decode('latin-1'), error.end
+
+
+class UTF8FallbackDecoder(codecs.BufferedIncrementalDecoder):
+    def __init__(self, errors: str = DECODE_ERRORS):
+        super().__init__(errors)
+
+    def _buffer_decode(self, data, errors, final):
+        return codecs.utf_8_decode(data, DECODE_ERRORS if errors == 'strict' else errors, final)
+
+
+def find_fallback_codec(name: str) -> Optional[codecs.CodecInfo]:
+    if name != UTF8_FALLBACK_CODEC:
+        return None
+    utf8 = codecs.lookup('utf-8')
+    return codecs.CodecInfo(
+        name=UTF8_FALLBACK_CODEC,
+        encode=utf8.encode,
+        decode=lambda data, errors='strict': codecs.utf_8_decode(data, DECODE_ERRORS, True),
+        incrementalencoder=utf8.incrementalencoder,
+        incrementaldecoder=UTF8FallbackDecoder,
+        streamreader=utf8.streamreader,
+        streamwriter=utf8.streamwriter,
+    )
+
+
+codecs.register_error(DECODE_ERRORS, decode_fallback)
+codecs.register(find_fallback_codec)
+
+
+def sniff_encoding(sample: bytes) -> str:
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # final=False: un carácter cortado al final de la muestra no es un error
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'  # decodifica cualquier byte
+
+
+def sniff_dialect(sample: bytes, expected_headers: Sequence[str]) -> CSVDialect:
+    """Guess encoding and delimiter from the first block of a file
+
+    The delimiter is the candidate that splits the header into all the
+    expected columns; failing that, csv.Sniffer's guess, and ',' otherwise.
+    """
+    encoding = sniff_encoding(sample)
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample, final=False)
+    lines = text.splitlines()
+    header_line = lines[0] if lines else ''
+
+    for delimiter in DELIMITERS:
+        header = next(csv.reader([header_line], delimiter=delimiter), [])
+        if all(name in normalize_headers(header) for name in expected_headers):
+            return CSVDialect(encoding, delimiter, header)
+
+    try:
+        delimiter = csv.Sniffer().sniff('\n'.join(lines[:20]), delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ','
+    return CSVDialect(encoding, delimiter, next(csv.reader([header_line], delimiter=delimiter), []))
+
+
+def normalize_headers(header: Sequence[str]) -> List[str]:
+    """Header names as compared against the expected ones: trimmed and lower case"""
+    return [name.strip().lower() for name in header]
+
+
+def split_columns(values: List[List[str]], chunk_size: int) -> Iterator[Columns]:
+    """Cut one large block of columns into chunks of chunk_size rows"""
+    for start in range(0, len(values[0]), chunk_size):
+        yield tuple(column[start:start + chunk_size] for column in values)
+
+
+def stdlib_chunks(stream: BinaryIO, dialect: CSVDialect, columns: Sequence[int], chunk_size: int) -> Iterator[Columns]:
+    """Pure-Python engine: the csv module, always available"""
+    text = io.TextIOWrapper(stream, encoding=dialect.encoding, errors=DECODE_ERRORS, newline='')
+    reader = csv.reader(text, delimiter=dialect.delimiter)
+    next(reader, None)  # cabecera
+    width = max(columns) + 1
+    nombre_index, proyecto_index, fecha_index = columns
+
+    nombres, proyectos, fechas = [], [], []
+    for row in reader:
+        if not row:
+            continue  # DictReader también saltaba las líneas vacías
+        if len(row) < width:
+            row += [''] * (width - len(row))
+        nombres.append(row[nombre_index])
+        proyectos.append(row[proyecto_index])
+        fechas.append(row[fecha_index])
+        if len(nombres) >= chunk_size:
+            yield nombres, proyectos, fechas
+            nombres, proyectos, fechas = [], [], []
+    if nombres:
+        yield nombres, proyectos, fechas
+    text.detach()  # el cargador sigue usando el flujo binario
+
+
+def pandas_chunks(stream: BinaryIO, dialect: CSVDialect, columns: Sequence[int], chunk_size: int) -> Iterator[Columns]:
+    """pandas C parser, reading only the three columns as plain strings"""
+    import pandas as pd
+
+    # names fija el ancho de la cabecera: las filas cortas se completan con '' y las largas se recortan,
+    # igual que en el motor en Python
+    reader = pd.read_csv(
+        stream, sep=dialect.delimiter, encoding=dialect.encoding, encoding_errors=DECODE_ERRORS,
+        header=None, skiprows=1,
+        names=list(range(len(dialect.header))), index_col=False,
+        usecols=list(columns), dtype=str, na_filter=False, engine='c',
+        chunksize=max(chunk_size, FAST_ENGINE_BLOCK_ROWS)
+    )
+    with reader:
+        for frame in reader:
+            yield from split_columns([frame[index].tolist() for index in columns], chunk_size)
+
+
+def pyarrow_chunks(stream: BinaryIO, dialect: CSVDialect, columns: Sequence[int], chunk_size: int) -> Iterator[Columns]:
+    """pyarrow's multithreaded streaming reader, reading only the three columns as strings"""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    names = [f"c{index}" for index in range(len(dialect.header))]
+    # pyarrow valida UTF-8 por su cuenta y no admite gestor de errores: se le pasa el códec con respaldo
+    encoding = UTF8_FALLBACK_CODEC if dialect.encoding == 'utf-8' else dialect.encoding
+    wanted = [names[index] for index in columns]
+    reader = pa_csv.open_csv(
+        stream,
+        read_options=pa_csv.ReadOptions(encoding=encoding, column_names=names, skip_rows=1,
+                                        block_size=4 * 1024 * 1024),
+        parse_options=pa_csv.ParseOptions(delimiter=dialect.delimiter, newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(include_columns=wanted,
+                                              column_types={name: pa.string() for name in wanted},
+                                              strings_can_be_null=False)
+    )
+    for batch in reader:
+        yield from split_columns([batch.column(name).to_pylist() for name in wanted], chunk_size)
+
+
+ENGINES = {
+    'stdlib': stdlib_chunks,
+    'pandas': pandas_chunks,
+    'pyarrow': pyarrow_chunks,
+}
+ENGINE_NAMES = ('auto',) + tuple(ENGINES)
+
+
+def engine_available(name: str) -> bool:
+    return name == 'stdlib' or importlib.util.find_spec(name) is not None
+
+
+def resolve_engine(name: str = 'auto', file_size: Optional[int] = None) -> str:
+    """Concrete engine for a requested name: 'auto' prefers pyarrow, then pandas, for large files"""
+    if name not in ENGINE_NAMES:
+        raise ValueError(f"Motor CSV desconocido: {name} (opciones: {', '.join(ENGINE_NAMES)})")
+    if name != 'auto':
+        if not engine_available(name):
+            raise ValueError(f"El motor CSV {name} no está instalado")
+        return name
+    if file_size is not None and file_size < FAST_ENGINE_MIN_BYTES:
+        return 'stdlib'
+    return next(engine for engine in ('pyarrow', 'pandas', 'stdlib') if engine_available(engine))
+
+
+def get_engine(name: str) -> Callable[[BinaryIO, CSVDialect, Sequence[int], int], Iterator[Columns]]:
+    return ENGINES[name]
@@ -0,0 +1,123 @@
+import hashlib
+import io
+import os
+from typing import Dict, Iterator, List, Optional
+from utils.csv_engines import SNIFF_BYTES, get_engine, normalize_headers, resolve_engine, sniff_dialect
+from utils.records import Record, make_records
+
+EXPECTED_HEADERS = ['nombre', 'proyecto', 'fecha']
+
+# Tipos de archivo de origen aceptados; los libros de Excel se leen con XLSXChunkLoader
+SOURCE_EXTENSIONS = ['csv', 'xlsx', 'xlsm']
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm')
+
+# Filas por bloque: suficiente para amortizar el coste por bloque sin retener la UI
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def new_content_hash():
+    """Hash used to fingerprint CSV contents (fast, 128-bit)"""
+    return hashlib.blake2b(digest_size=16)
+
+
+class CSVFormatError(ValueError):
+    """The CSV file does not have the expected columns"""
+
+
+class CountingStream(io.RawIOBase):
+    """Raw byte stream that reports every block read to its loader (progress and content hash)"""
+
+    def __init__(self, file, loader: 'CSVChunkLoader'):
+        self.file = file
+        self.loader = loader
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = self.file.readinto(buffer)
+        if size:
+            self.loader.bytes_read += size
+            self.loader.content_digest.update(memoryview(buffer)[:size])
+        return size
+
+
+class CSVChunkLoader:
+    """Parse a nombre,proyecto,fecha CSV in chunks of records
+
+    Iterating yields lists of at most chunk_size Record tuples; bytes_read and
+    progress tell how far into the file the parser is, so callers can report
+    progress while the rest of the file is still being read.
+
+    Encoding (UTF-8 or Windows-1252) and delimiter (',', ';', tab or '|') are
+    sniffed from the first block, and header names are matched ignoring case
+    and surrounding spaces. Bytes further down that are not valid UTF-8 are
+    read as Windows-1252. engine is 'auto' or one of csv_engines.ENGINES.
+    'auto' uses pyarrow or pandas, when installed, for large files.
+    """
+
+    def __init__(self, file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, engine: str = 'auto'):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.total_bytes = os.path.getsize(file_path)
+        self.engine = resolve_engine(engine, self.total_bytes)
+        self.dialect = None
+        self.bytes_read = 0
+        self.rows_read = 0
+        self.content_digest = new_content_hash()
+
+    @property
+    def content_hash(self) -> str:
+        """Hash of the bytes read so far; the whole file's once iteration has finished"""
+        return self.content_digest.hexdigest()
+
+    @property
+    def progress(self) -> float:
+        """Fraction of the file parsed so far (0.0 - 1.0)"""
+        if not self.total_bytes:
+            return 1.0
+        return min(self.bytes_read / self.total_bytes, 1.0)
+
+    def __iter__(self) -> Iterator[List[Record]]:
+        with open(self.file_path, 'rb') as file:
+            self.dialect = sniff_dialect(file.read(SNIFF_BYTES), EXPECTED_HEADERS)
+            file.seek(0)
+
+            # Verify headers
+            header = normalize_headers(self.dialect.header)
+            if not all(name in header for name in EXPECTED_HEADERS):
+                raise CSVFormatError("El archivo CSV debe tener las columnas: nombre, proyecto, fecha")
+            columns = tuple(header.index(name) for name in EXPECTED_HEADERS)
+
+            stream = io.BufferedReader(CountingStream(file, self))
+            try:
+                for nombres, proyectos, fechas in get_engine(self.engine)(stream, self.dialect, columns, self.chunk_size):
+                    chunk = make_records(nombres, proyectos, fechas)
+                    self.rows_read += len(chunk)
+                    yield chunk
+            except UnicodeDecodeError as e:
+                raise CSVFormatError(f"El archivo no se puede leer como {self.dialect.encoding}: {e}") from e
+
+            # Lo que el motor no llegara a leer también cuenta para el hash del contenido
+            if not stream.closed:
+                while stream.read(1024 * 1024):
+                    pass
+
+
+def is_workbook(file_path: str) -> bool:
+    return file_path.lower().endswith(WORKBOOK_EXTENSIONS)
+
+
+def open_source(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, engine: str = 'auto',
+                sheet: Optional[str] = None, columns: Optional[Dict[str, str]] = None):
+    """Chunk loader for a CSV or an .xlsx workbook, chosen by extension"""
+    if is_workbook(file_path):
+        from utils.xlsx_loader import XLSXChunkLoader
+        return XLSXChunkLoader(file_path, chunk_size, sheet=sheet, columns=columns)
+    return CSVChunkLoader(file_path, chunk_size, engine)
+
+
+def iter_csv_records(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, engine: str = 'auto') -> Iterator[Record]:
+    """Stream the records of a CSV (or .xlsx) file one by one without materializing the whole file"""
+    for chunk in open_source(file_path, chunk_size, engine):
+        yield from chunk
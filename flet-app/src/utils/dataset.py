@@ -0,0 +1,87 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from utils.records import Record, parse_fecha, project_code
+
+# (nombre, year, month, {day: project code}) of one employee month
+MonthGroup = Tuple[str, int, int, Dict[int, str]]
+
+
+def as_records(data: Iterable) -> List[Record]:
+    """The rows as Records, accepting the dict rows older callers still pass"""
+    records = data if isinstance(data, list) else list(data)
+    if records and not isinstance(records[0], tuple):
+        records = [Record(row['nombre'], row['proyecto'], row['fecha']) for row in records]
+    return records
+
+
+class PayrollDataset:
+    """Loaded records plus the indexes the UI and the generator query, built once at load time
+
+    Behaves like the list of records for paging and counting. The indexes are:
+    months (employee -> (year, month) -> {day: project code}, days sorted and
+    the last record of a day winning), record counts per employee and per
+    project, and the records whose date could not be read.
+    """
+
+    def __init__(self, data: Iterable):
+        self.records = as_records(data)
+        self.months: Dict[str, Dict[Tuple[int, int], Dict[int, str]]] = {}
+        self.employee_records: Dict[str, int] = {}
+        self.project_records: Dict[str, int] = {}
+        self.invalid_dates: List[Tuple[str, str]] = []
+        self._build_indexes()
+
+    def _build_indexes(self):
+        months = self.months
+        employee_records = self.employee_records
+        project_records = self.project_records
+
+        # Un solo recorrido: fechas y códigos de proyecto salen de los decodificadores memorizados
+        for nombre, proyecto, fecha in self.records:
+            employee_records[nombre] = employee_records.get(nombre, 0) + 1
+            project_records[proyecto] = project_records.get(proyecto, 0) + 1
+            date = parse_fecha(fecha)
+            if date is None:
+                self.invalid_dates.append((nombre, fecha))
+                continue
+            employee_months = months.get(nombre)
+            if employee_months is None:
+                employee_months = months[nombre] = {}
+            year, month_num, day = date
+            days = employee_months.get((year, month_num))
+            if days is None:
+                days = employee_months[(year, month_num)] = {}
+            days[day] = project_code(proyecto)
+
+        for employee_months in months.values():
+            for key, days in employee_months.items():
+                employee_months[key] = dict(sorted(days.items()))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[Record]:
+        return iter(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    @property
+    def employee_count(self) -> int:
+        return len(self.employee_records)
+
+    @property
+    def project_count(self) -> int:
+        return len(self.project_records)
+
+    def employee_months(self, employee_name: str) -> Dict[Tuple[int, int], Dict[int, str]]:
+        """{(year, month): {day: project code}} of one employee"""
+        return self.months.get(employee_name, {})
+
+    def groups(self) -> List[MonthGroup]:
+        """One (nombre, year, month, {day: project code}) entry per employee month, in order of appearance"""
+        return [
+            (employee_name, year, month_num, days)
+            for employee_name, employee_months in self.months.items()
+            for (year, month_num), days in employee_months.items()
+        ]
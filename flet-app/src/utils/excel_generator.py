@@ -1,262 +1,611 @@
-import pandas as pd
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment, Border, Side
-from openpyxl.worksheet.page import PageMargins
-from openpyxl.utils.dataframe import dataframe_to_rows
 from datetime import datetime
-import calendar
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
 import os
-from typing import List, Dict
+import time
+from typing import Callable, Iterable, List, Dict, Optional, Tuple
+from utils.file_writer import AtomicFileWriter, DEFAULT_FSYNC, ZipBundleWriter, share_write_limit
+from utils.manifest import GenerationManifest, slice_hash, template_identity
+from utils.dataset import PayrollDataset
+from utils.instrumentation import PhaseTimer, EmployeeProfiler, build_report, keep_slowest_profiles, peak_rss_mb, report_json
+
+# openpyxl (y los módulos que lo usan) se importa al primer uso:
+# cargarlo cuesta cientos de ms y la ventana no lo necesita para arrancar
+
+
+# 'standard' construye cada libro en memoria con openpyxl; 'streaming' escribe los libros nuevos
+# directamente como SpreadsheetML y añade/reemplaza hojas en los existentes sin cargar el resto
+BACKENDS = ('standard', 'streaming')
+
+
+# Hoja de totales por persona del modo consolidado
+SUMMARY_SHEET = 'Resumen'
+SUMMARY_HEADERS = ['EMPLEADO', 'DÍAS', 'DIETAS', 'ALOJAMIENTO', 'GASOIL', 'KM', 'PEAJE', 'TOTAL']
+# Celdas de totales de la hoja mensual que se copian al resumen (columnas C a H del resumen)
+SUMMARY_TOTAL_CELLS = ['B37', 'C37', 'D37', 'E37', 'F37', 'E39']
+
+
+# (year, month, {day: project code}) of one employee month
+MonthData = Tuple[int, int, Dict[int, str]]
+
+
+def default_workers() -> int:
+    """Default process pool size: one worker per available core"""
+    return os.cpu_count() or 1
+
+
+def _generate_employee_file(task: Tuple[Dict, str, str, List[MonthData], float]) -> Tuple[List[str], Optional[str], Dict]:
+    """Process pool entry point: build a single employee's files in a worker process"""
+    config, output_folder, employee_name, months, dieta_amount = task
+    generator = ExcelGenerator(**config)
+    generator.output_folder = output_folder
+    return generator.run_employee_task(employee_name, months, dieta_amount)
+
 
 class ExcelGenerator:
-    def __init__(self):
+    def __init__(self, template_path: Optional[str] = None, backend: str = 'standard',
+                 profile_dir: Optional[str] = None, fsync: str = DEFAULT_FSYNC, staging_dir: Optional[str] = None,
+                 batch_writes: bool = False, max_concurrent_writes: Optional[int] = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+        self.template_path = template_path
+        self.backend = backend
+        self.profile_dir = profile_dir  # si se indica, cada empleado se perfila con cProfile/tracemalloc
+        # Los archivos se preparan en local y se mueven al destino de forma atómica (ver AtomicFileWriter)
+        self.write_options = {
+            'fsync': fsync, 'staging_dir': staging_dir, 'batch_writes': batch_writes,
+            'max_concurrent_writes': max_concurrent_writes,
+        }
+        self.file_writer = AtomicFileWriter(fsync, staging_dir, batch_writes, max_concurrent_writes)
+        self.timer = PhaseTimer()
+        self.last_report = None
         self.data = []
         self.output_folder = None
+        self.errors = []
+        self.skipped_sheets = 0
+        self.cancelled = False
+        
+    def generate_excel_files(self, data: Iterable[Dict], output_folder: str, dieta_amount: float = 0.00,
+                             workers: Optional[int] = 1, incremental: bool = True,
+                             progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                             cancel_event=None):
+        """Generate Excel files for each employee
+
+        With workers > 1 each employee is built in its own task on a process
+        pool (workers=None sizes the pool to the number of cores). Per-file errors
+        are collected in self.errors, in the same order as the employees.
+
+        With incremental=True, month sheets whose inputs hash the same as in the
+        output folder's manifest are skipped; self.skipped_sheets counts them.
+
+        progress_callback(done, total, employee_name) is called as each employee
+        finishes. Setting cancel_event (a threading.Event) stops the batch between
+        employees; files already written are kept and self.cancelled is set.
         
-    def generate_excel_files(self, data: List[Dict], output_folder: str, dieta_amount: float = 0.00):
-        """Generate Excel files for each employee"""
+        Files are staged locally and moved into output_folder atomically; when
+        the generator was built with batch_writes=True they are all moved at the
+        end of the run instead of as each one is finished.
+
+        After each run self.last_report holds the timings per phase and per
+        employee, bytes written and peak memory (see report_json()).
+        """
+        started = time.perf_counter()
+        timer = PhaseTimer()
         self.data = data
         self.output_folder = output_folder
+        self.errors = []
+        self.skipped_sheets = 0
+        self.cancelled = False
         
-        # Group data by employee
-        employees = {}
-        for row in data:
-            name = row['nombre']
-            if name not in employees:
-                employees[name] = []
-            employees[name].append(row)
+        with timer.phase('group'):
+            groups = self.group_records(data)
+        
+        with timer.phase('manifest'):
+            # Sin carpeta de destino (exportación ZIP) no hay manifiesto que consultar ni guardar
+            manifest = GenerationManifest(output_folder) if output_folder is not None else None
+            employees, digests = self.pending_months(groups, manifest, dieta_amount, incremental)
+        
+        if self.skipped_sheets:
+            print(f"{self.skipped_sheets} hoja(s) sin cambios, se omiten")
+        
+        config = self.worker_config()
+        tasks = [(config, output_folder, name, months, dieta_amount) for name, months in employees.items()]
+        names = list(employees)
+        
+        def on_done(index: int, done: int):
+            if progress_callback:
+                progress_callback(done, len(tasks), names[index])
+        
+        with timer.phase('write'):
+            results = self.run_tasks(tasks, workers, on_done, cancel_event)
         
         generated_files = []
+        employee_stats = []
+        employee_errors = {}
         
-        for employee_name, employee_data in employees.items():
-            file_path = self.create_or_update_employee_excel(employee_name, employee_data, dieta_amount)
-            if file_path:
-                generated_files.append(file_path)
+        for employee_name, result in zip(names, results):
+            if result is None:
+                # Cancelado antes de empezar este empleado
+                self.cancelled = True
+                continue
+            file_paths, error, stats = result
+            employee_stats.append(stats)
+            generated_files.extend(file_paths)
+            if error:
+                employee_errors[employee_name] = error
+        
+        if self.file_writer.batch:
+            # Todo el lote se mueve a la carpeta de destino de una vez
+            with timer.phase('commit'):
+                owners = {}
+                staged = []
+                for stats in employee_stats:
+                    for staged_path, file_path in stats.pop('staged', []):
+                        owners[file_path] = stats['employee']
+                        staged.append((staged_path, file_path))
+                for file_path, error in self.file_writer.commit_all(staged):
+                    employee_errors.setdefault(owners[file_path], error)
+                    generated_files.remove(file_path)
+        
+        for employee_name, result in zip(names, results):
+            if result is None:
+                continue
+            if employee_name in employee_errors:
+                self.errors.append((employee_name, employee_errors[employee_name]))
+            elif manifest is not None:
+                # Solo se registran los empleados escritos por completo
+                for key, digest in digests[employee_name]:
+                    manifest.update(key, digest)
+        
+        if employees and manifest is not None:
+            manifest.save()
+        
+        profiles = keep_slowest_profiles(employee_stats) if self.profile_dir else []
+        self.last_report = build_report(
+            timer,
+            employee_stats,
+            backend=self.backend,
+            workers=default_workers() if workers is None else workers,
+            employees=len(employees),
+            files=len(generated_files),
+            sheets_written=sum(stats['sheets'] for stats in employee_stats),
+            sheets_skipped=self.skipped_sheets,
+            errors=len(self.errors),
+            cancelled=self.cancelled,
+            total_seconds=round(time.perf_counter() - started, 4),
+            profiles=profiles
+        )
         
         return generated_files
     
-    def create_or_update_employee_excel(self, employee_name: str, employee_data: List[Dict], dieta_amount: float):
-        """Create or update Excel file for a specific employee"""
+    def generate_zip_bundle(self, data: Iterable[Dict], target, dieta_amount: float = 0.00, consolidated: bool = False,
+                            progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                            cancel_event=None) -> List[str]:
+        """Stream every workbook into one ZIP written to target (a path or a writable binary stream)
+
+        For web mode, where there is no server-side folder for the user to
+        open. Workbooks are built one at a time in this process and written
+        straight into their ZIP entries, so memory stays bounded by a single
+        workbook whatever the size of the batch. Returns the entry names.
+        With consolidated=True the bundle holds one workbook per month.
+        """
+        folder_writer = self.file_writer
+        bundle = self.file_writer = ZipBundleWriter(target)
         try:
-            # Get month and year from first record
-            if employee_data:
-                first_date = datetime.strptime(employee_data[0]['fecha'], '%d/%m/%Y')
-                month_name = self.months_to_spanish(first_date.strftime('%B'))
-                year = first_date.year
-                month_num = first_date.month
+            if consolidated:
+                self.generate_consolidated_files(data, None, dieta_amount,
+                                                 progress_callback=progress_callback, cancel_event=cancel_event)
             else:
+                self.generate_excel_files(data, None, dieta_amount, workers=1, incremental=False,
+                                          progress_callback=progress_callback, cancel_event=cancel_event)
+        finally:
+            self.file_writer = folder_writer
+            bundle.close()
+        return bundle.names
+    
+    def report_json(self) -> str:
+        """The last run's report as JSON"""
+        return report_json(self.last_report or {})
+    
+    def pending_months(self, groups: List[Tuple[str, int, int, Dict[int, str]]], manifest: Optional[GenerationManifest],
+                       dieta_amount: float, incremental: bool):
+        """Split the grouped months into the ones to write, per employee, and their manifest digests
+
+        Names that map to the same workbook (e.g. differing only in case) are
+        merged into one task under the first spelling seen, so a single worker
+        owns each file; otherwise parallel tasks would overwrite each other's sheets.
+        """
+        template_id = template_identity(self.template_path)
+        employees = {}
+        digests = {}
+        owners = {}
+        for employee_name, year, month_num, projects_by_day in groups:
+            key = GenerationManifest.key(employee_name, year, month_num)
+            digest = slice_hash(employee_name, year, month_num, projects_by_day, dieta_amount, template_id)
+            if (incremental and manifest is not None and manifest.is_current(key, digest)
+                    and os.path.exists(self.employee_file_path(employee_name, year))):
+                self.skipped_sheets += 1
+                continue
+            owner = owners.setdefault(self.employee_file_key(employee_name), employee_name)
+            employees.setdefault(owner, []).append((year, month_num, projects_by_day))
+            digests.setdefault(owner, []).append((key, digest))
+        return employees, digests
+    
+    def group_records(self, data: Iterable[Dict]) -> List[Tuple[str, int, int, Dict[int, str]]]:
+        """Group the records into employee months through the dataset's indexes
+
+        Returns one (nombre, year, month, {day: project code}) entry per employee
+        and month, in order of first appearance. A PayrollDataset is used as is;
+        any other iterable of records is indexed first. Records with an
+        unreadable date are reported in self.errors and skipped.
+        """
+        dataset = data if isinstance(data, PayrollDataset) else PayrollDataset(data)
+        for employee_name, fecha in dataset.invalid_dates:
+            self.errors.append((employee_name, f"Fecha inválida: {fecha}"))
+        return dataset.groups()
+    
+    def warm_up(self):
+        """Import the heavy dependencies and build the sheet template ahead of the first generation"""
+        self.template
+        if self.backend == 'streaming':
+            from utils.xlsx_writer import get_stream_writer
+            get_stream_writer(self.template_path)
+    
+    def worker_config(self) -> Dict:
+        """Constructor arguments needed to rebuild this generator in a worker process"""
+        return dict(
+            self.write_options,
+            template_path=self.template_path, backend=self.backend, profile_dir=self.profile_dir
+        )
+    
+    @property
+    def template(self):
+        """Monthly sheet template, built once per process"""
+        from utils.sheet_template import get_template
+        return get_template(self.template_path)
+    
+    def run_tasks(self, tasks: List[Tuple[Dict, str, str, List[MonthData], float]], workers: Optional[int] = 1,
+                  on_done: Optional[Callable[[int, int], None]] = None, cancel_event=None):
+        """Run employee tasks sequentially or on a process pool, keeping the input order
+
+        on_done(index, done) is called as each task finishes. Once cancel_event
+        is set no further task is started; the results of tasks that never ran
+        are None.
+        """
+        results = [None] * len(tasks)
+        if not tasks:
+            return results
+        
+        if workers is None:
+            workers = default_workers()
+        workers = min(workers, len(tasks))
+        
+        def cancelled():
+            return cancel_event is not None and cancel_event.is_set()
+        
+        if workers <= 1:
+            for index, (_, _, name, months, dieta) in enumerate(tasks):
+                if cancelled():
+                    break
+                results[index] = self.run_employee_task(name, months, dieta)
+                if on_done:
+                    on_done(index, index + 1)
+            return results
+        
+        # Con un límite de escrituras, los workers comparten un único semáforo
+        write_limit = None
+        if self.write_options['max_concurrent_writes'] and not self.write_options['batch_writes']:
+            import multiprocessing
+            write_limit = multiprocessing.Semaphore(self.write_options['max_concurrent_writes'])
+        
+        # Un empleado por tarea; los resultados se guardan en su posición original
+        with ProcessPoolExecutor(max_workers=workers, initializer=share_write_limit, initargs=(write_limit,)) as executor:
+            futures = {executor.submit(_generate_employee_file, task): index for index, task in enumerate(tasks)}
+            done = 0
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                index = futures[future]
+                results[index] = future.result()
+                done += 1
+                if on_done:
+                    on_done(index, done)
+                if cancelled():
+                    # Las tareas en curso terminan su archivo; las pendientes no empiezan
+                    for pending in futures:
+                        pending.cancel()
+        return results
+    
+    def run_employee_task(self, employee_name: str, months: List[MonthData], dieta_amount: float):
+        """Build one employee's month sheets and return (file_paths, error, stats)
+
+        Months are partitioned by year so each yearly workbook is opened and
+        saved once, however many months of it the input covers. stats holds the
+        employee's duration, phase timings and bytes written.
+        """
+        years = {}
+        for year, month_num, projects_by_day in months:
+            years.setdefault(year, []).append((month_num, projects_by_day))
+        
+        self.timer = PhaseTimer()
+        started = time.perf_counter()
+        bytes_before = self.file_writer.bytes_written
+        profiler = EmployeeProfiler(self.profile_dir, employee_name) if self.profile_dir else nullcontext()
+        
+        file_paths = []
+        error = None
+        with profiler:
+            try:
+                for year, year_months in years.items():
+                    file_paths.append(self.write_employee_year(employee_name, year, year_months, dieta_amount))
+            except Exception as e:
+                print(f"Error creating/updating Excel for {employee_name}: {e}")
+                error = str(e)
+        
+        stats = {
+            'employee': employee_name,
+            'seconds': round(time.perf_counter() - started, 4),
+            'sheets': len(months),
+            'bytes': self.file_writer.bytes_written - bytes_before,
+            'phases': self.timer.phases,
+            'peak_rss_mb': peak_rss_mb(),  # del proceso que ejecuta la tarea (worker o principal)
+        }
+        if self.file_writer.batch:
+            # Archivos preparados que generate_excel_files moverá a su destino al final
+            stats['staged'], self.file_writer.pending = self.file_writer.pending, []
+        if self.profile_dir:
+            stats['profile'] = profiler.profile_path
+            stats['memory_profile'] = profiler.memory_path
+            stats['peak_traced_bytes'] = profiler.peak_traced_bytes
+        return file_paths, error, stats
+    
+    def create_or_update_employee_excel(self, employee_name: str, employee_data: List[Dict], dieta_amount: float):
+        """Create or update Excel file for a specific employee"""
+        months = [(year, month_num, projects) for _, year, month_num, projects in self.group_records(employee_data)]
+        file_paths, _, stats = self.run_employee_task(employee_name, months, dieta_amount)
+        self.file_writer.commit_all(stats.get('staged', []))
+        return file_paths[-1] if file_paths else None
+    
+    def generate_consolidated_files(self, data: Iterable[Dict], output_folder: str, dieta_amount: float = 0.00,
+                                    progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                                    cancel_event=None):
+        """Write one workbook per month with every employee's sheet plus a summary sheet
+
+        Whatever the backend, the workbooks are streamed straight to SpreadsheetML.
+        Each month becomes a single zip archive written once. A month that fails
+        is reported in self.errors.
+
+        progress_callback(done, total, 'MM/YYYY') is called as each month
+        finishes. Setting cancel_event stops the run between months (or between
+        the employees of the month being built, which is then not written);
+        finished months are kept and self.cancelled is set.
+        """
+        self.data = data
+        self.output_folder = output_folder
+        self.errors = []
+        self.skipped_sheets = 0
+        self.cancelled = False
+        self.last_report = None
+        
+        months = {}
+        for employee_name, year, month_num, projects_by_day in self.group_records(data):
+            months.setdefault((year, month_num), []).append((employee_name.upper(), projects_by_day))
+        
+        generated_files = []
+        for done, ((year, month_num), employees) in enumerate(sorted(months.items()), 1):
+            if cancel_event is not None and cancel_event.is_set():
+                self.cancelled = True
+                break
+            try:
+                file_path = self.write_consolidated_month(year, month_num, employees, dieta_amount, cancel_event)
+                if file_path is None:
+                    self.cancelled = True
+                    break
+                generated_files.append(file_path)
+            except Exception as e:
+                print(f"Error creating consolidated Excel for {month_num:02d}/{year}: {e}")
+                self.errors.append((f"{month_num:02d}/{year}", str(e)))
+            if progress_callback:
+                progress_callback(done, len(months), f"{month_num:02d}/{year}")
+        
+        for file_path, error in self.file_writer.commit_all():
+            self.errors.append((os.path.basename(file_path), error))
+            generated_files.remove(file_path)
+        
+        return generated_files
+    
+    def write_consolidated_month(self, year: int, month_num: int, employees: List[Tuple[str, Dict[int, str]]],
+                                 dieta_amount: float, cancel_event=None) -> Optional[str]:
+        """Stream one month's workbook: summary sheet first, then one template sheet per employee
+
+        Returns None, without writing anything, if cancel_event is set while the sheets are built.
+        """
+        from utils.xlsx_writer import get_stream_writer, sheet_title
+        
+        writer = get_stream_writer(self.template_path)
+        month_name = self.months_to_spanish(datetime(year, month_num, 1).strftime('%B'))
+        file_path = os.path.join(self.output_folder or '', f"GASTOS_{month_name.upper()}_{year}.xlsx")
+        
+        used_titles = {SUMMARY_SHEET.lower()}
+        sheets = []
+        summary_rows = []
+        for employee_name, projects_by_day in sorted(employees):
+            if cancel_event is not None and cancel_event.is_set():
                 return None
-            
-            # Define file path
-            employee_name = employee_name.upper()
-            
-            filename = f"{employee_name.replace(' ', '_')}_GASTOS_{year}.xlsx"
-            file_path = os.path.join(self.output_folder, filename)
-            
-            # Check if file exists
-            if os.path.exists(file_path):
-                print(f"Archivo existente encontrado para {employee_name}, agregando nueva hoja...")
-                wb = load_workbook(file_path)
-                
-                # Check if sheet with month name already exists
-                sheet_name = f"{month_name}_{year}"
-                if sheet_name in wb.sheetnames:
-                    print(f"Hoja {sheet_name} ya existe, sobrescribiendo...")
-                    wb.remove(wb[sheet_name])
-                
-                # Create new worksheet
-                ws = wb.create_sheet(title=sheet_name)
-            else:
-                print(f"Creando nuevo archivo para {employee_name}...")
-                wb = Workbook()
-                ws = wb.active
-                # Name the first sheet with month and year
-                sheet_name = f"{month_name}_{year}"
-                ws.title = sheet_name
-            
-            # Fill the worksheet with data
-            self.fill_worksheet(ws, employee_name, employee_data, dieta_amount, month_name, year, month_num)
-            
-            # Apply formatting
-            self.apply_formatting(ws)
-            
-            # Configure page setup for A4 format
-            ws.page_setup.paperSize = ws.PAPERSIZE_A4
-            ws.page_setup.orientation = ws.ORIENTATION_PORTRAIT
-            ws.page_setup.fitToWidth = 1
-            ws.page_setup.fitToHeight = 0  # 0 = automático
-            
-            # Configure page margins (1 cm = 0.393701 inches)
-            ws.page_margins = PageMargins(
-                left=0.393701,   # 1 cm
-                right=0.393701,  # 1 cm
-                top=0.393701,    # 1 cm
-                bottom=0.393701, # 1 cm
-                header=0,        # Sin encabezado
-                footer=0         # Sin pie de página
-            )
-            
-            # Save file
-            wb.save(file_path)
+            title = sheet_title(employee_name, used_titles)
+            sheets.append((title, self.sheet_values(employee_name, projects_by_day, dieta_amount, month_name, year)))
+            summary_rows.append((employee_name, title, len(projects_by_day)))
+        
+        sheets.insert(0, (SUMMARY_SHEET, self.summary_sheet_xml(writer, summary_rows)))
+        
+        print(f"Creando archivo consolidado de {month_name} {year} con {len(employees)} empleados...")
+        self.file_writer.save(file_path, lambda staged_path: writer.write(staged_path, sheets))
+        print(f"Archivo guardado: {file_path}")
+        
+        return file_path
+    
+    def summary_sheet_xml(self, writer, rows: List[Tuple[str, str, int]]) -> bytes:
+        """Summary sheet with one row per (employee, sheet title, worked days)
+
+        The amounts are formulas pointing at each employee sheet's totals, so
+        later edits to an employee sheet show up in the summary.
+        """
+        # Reutilizar los estilos de la plantilla: cabecera, texto, días, importes y totales
+        header_style = writer.style_ids.get('A5', 0)
+        text_style = writer.style_ids.get('G6', 0)
+        day_style = writer.style_ids.get('A6', 0)
+        amount_style = writer.style_ids.get('B6', 0)
+        total_label_style = writer.style_ids.get('A37', 0)
+        total_style = writer.style_ids.get('B37', 0)
+        
+        values = {}
+        cell_styles = {}
+        for column, header in enumerate(SUMMARY_HEADERS, 1):
+            values[(1, column)] = header
+            cell_styles[(1, column)] = header_style
+        
+        for row, (employee_name, title, days) in enumerate(rows, 2):
+            reference = "'" + title.replace("'", "''") + "'"
+            values[(row, 1)] = employee_name
+            cell_styles[(row, 1)] = text_style
+            values[(row, 2)] = days
+            cell_styles[(row, 2)] = day_style
+            for column, cell in enumerate(SUMMARY_TOTAL_CELLS, 3):
+                values[(row, column)] = f"={reference}!{cell}"
+                cell_styles[(row, column)] = amount_style
+        
+        total_row = len(rows) + 2
+        last_row = total_row - 1
+        values[(total_row, 1)] = 'TOTAL'
+        cell_styles[(total_row, 1)] = total_label_style
+        for column in range(2, len(SUMMARY_HEADERS) + 1):
+            letter = chr(64 + column)
+            values[(total_row, column)] = f"=SUM({letter}2:{letter}{last_row})" if rows else 0
+            cell_styles[(total_row, column)] = total_style
+        
+        column_widths = {1: 35, 2: 8}
+        column_widths.update({column: 13 for column in range(3, len(SUMMARY_HEADERS) + 1)})
+        return writer.plain_sheet_xml(values, cell_styles, column_widths, selected=True)
+    
+    @staticmethod
+    def employee_file_key(employee_name: str) -> str:
+        """File name stem of an employee's workbooks; names with the same key share their files"""
+        return employee_name.upper().replace(' ', '_')
+    
+    def employee_file_path(self, employee_name: str, year: int) -> str:
+        """Path of an employee's yearly workbook in the output folder"""
+        filename = f"{self.employee_file_key(employee_name)}_GASTOS_{year}.xlsx"
+        return os.path.join(self.output_folder or '', filename)
+    
+    def write_employee_year(self, employee_name: str, year: int, months: List[Tuple[int, Dict[int, str]]], dieta_amount: float):
+        """Create or update the month sheets of an employee's yearly file, raising on failure"""
+        employee_name = employee_name.upper()
+        file_path = self.employee_file_path(employee_name, year)
+        
+        # (sheet name, month name, projects by day) in calendar order
+        sheets = []
+        for month_num, projects_by_day in sorted(months, key=lambda month: month[0]):
+            month_name = self.months_to_spanish(datetime(year, month_num, 1).strftime('%B'))
+            sheets.append((f"{month_name}_{year}", month_name, projects_by_day))
+        
+        if self.backend == 'streaming':
+            with self.timer.phase('sheet_values'):
+                values = [
+                    (sheet_name, self.sheet_values(employee_name, projects_by_day, dieta_amount, month_name, year))
+                    for sheet_name, month_name, projects_by_day in sheets
+                ]
+            with self.timer.phase('save'):
+                if self.file_writer.exists(file_path):
+                    print(f"Archivo existente encontrado para {employee_name}, actualizando {len(values)} hoja(s)...")
+                    self.update_streaming_workbook(file_path, values)
+                else:
+                    print(f"Creando nuevo archivo para {employee_name} (streaming)...")
+                    self.write_streaming_workbook(file_path, values)
             print(f"Archivo guardado: {file_path}")
-            
             return file_path
-            
-        except Exception as e:
-            print(f"Error creating/updating Excel for {employee_name}: {e}")
-            return None
-    
-    def fill_worksheet(self, ws, employee_name: str, employee_data: List[Dict], dieta_amount: float, month_name: str, year: int, month_num: int):
-        """Fill worksheet with employee data"""
         
-        # Header section
-        ws['A1'] = 'MES'
-        ws['C1'] = month_name.upper()
-        ws['E1'] = 'AÑO'
-        ws['F1'] = year
-        
-        ws['A2'] = 'NOMBRE'
-        ws['C2'] = employee_name
-        ws['E2'] = 'VALOR'
-        ws['F2'] = dieta_amount
-        
-        # Table headers (row 5)
-        headers = ['Fecha', 'DIETAS', 'ALOJAMIENTO', 'GASOIL', 'KM', 'PEAJE', 'OBRA', 'FIRMA']
-        for col, header in enumerate(headers, 1):
-            ws.cell(row=5, column=col, value=header)
-        
-        # Get days in month
-        days_in_month = calendar.monthrange(year, month_num)[1]
-        
-        # Create work days set from employee data
-        work_days = set()
-        projects_by_day = {}
-        
-        for record in employee_data:
-            day = datetime.strptime(record['fecha'], '%d/%m/%Y').day
-            work_days.add(day)
-            # Extraer solo el código del proyecto (antes del primer guión)
-            project_full = record['proyecto']
-            if ' - ' in project_full:
-                project_code = project_full.split(' - ')[0].strip()
-            else:
-                project_code = project_full.strip()
-            projects_by_day[day] = project_code
+        from openpyxl import Workbook, load_workbook
         
-        # Fill days (rows 6 to 36, exactamente como solicitas)
-        for day in range(1, 32):  # Días 1 a 31 (filas 6 a 36)
-            row_num = day + 5  # día 1 = fila 6, día 31 = fila 36
-            ws.cell(row=row_num, column=1, value=day)  # Date
+        with self.timer.phase('template'):
+            template = self.template
+        
+        # Check if file exists
+        if self.file_writer.exists(file_path):
+            print(f"Archivo existente encontrado para {employee_name}, agregando nuevas hojas...")
+            with self.timer.phase('load_workbook'):
+                wb = load_workbook(file_path)
             
-            for day in range(1, 32):  # Días 1 a 31 (filas 6 a 36)
-                row_num = day + 5  # día 1 = fila 6, día 31 = fila 36
-                ws.cell(row=row_num, column=1, value=day)  # Date
-                
-                if day in work_days:
-                    # Para días de trabajo: B=F2, C,D,E,F=0, G=proyecto
-                    ws.cell(row=row_num, column=2, value='=$F$2')  # DIETAS = F2
-                    ws.cell(row=row_num, column=3, value=0)        # ALOJAMIENTO = 0
-                    ws.cell(row=row_num, column=4, value=0)        # GASOIL = 0
-                    ws.cell(row=row_num, column=5, value=0)        # KM = 0
-                    ws.cell(row=row_num, column=6, value=0)        # PEAJE = 0
-                    ws.cell(row=row_num, column=7, value=projects_by_day.get(day, ''))  # OBRA
-                else:
-                    # Para días sin trabajo: todas las columnas con fórmulas pero valores 0
-                    ws.cell(row=row_num, column=7, value='')
-        # Total row (row 37)
-        total_row = 37
-        ws.cell(row=total_row, column=1, value='TOTAL')
-        
-        # Totales con fórmulas de suma de B6:B36, C6:C36, etc.
-        ws.cell(row=total_row, column=2, value='=SUM(B6:B36)')  # DIETAS
-        ws.cell(row=total_row, column=3, value='=SUM(C6:C36)')  # ALOJAMIENTO
-        ws.cell(row=total_row, column=4, value='=SUM(D6:D36)')  # GASOIL
-        ws.cell(row=total_row, column=5, value='=SUM(E6:E36)')  # KM
-        ws.cell(row=total_row, column=6, value='=SUM(F6:F36)')  # PEAJE
-        
-        # Gran total en E39 (suma de B37:F37)
-        grand_total_row = 39
-        ws.cell(row=grand_total_row, column=4, value='Total:')
-        ws.cell(row=grand_total_row, column=5, value=f'=SUM(B{total_row}:F{total_row})')
-        
-        # Footer sections
-        received_row = grand_total_row + 2
-        ws.cell(row=received_row, column=1, value='Recibí:')
-        
-        date_row = received_row + 6
-        ws.cell(row=date_row, column=1, value='Fecha:')
-        
-        # Declaration text with wrap text
-        declaration_row = date_row + 2
-        declaration_text = ("El trabajador declara que los días señalados en cada una de las fechas consignadas en este documento "
-                          "realizó todas y cada una de las rutas y desplazamientos, e incurrió en los gastos que se indican para "
-                          "cada una de ellas, en ejercicio de su cargo y/o actividad laboral, validando con esta firma la totalidad "
-                          "de las mismas. Y para que conste firma el presente documento en la fecha señalada.")
-        
-        # Configure the declaration cell with wrap text
-        declaration_cell = ws.cell(row=declaration_row, column=1, value=declaration_text)
-        declaration_cell.alignment = Alignment(
-            horizontal='justify',
-            vertical='top',
-            wrap_text=True
-        )
+            # Check if sheets with these month names already exist
+            for sheet_name, _, _ in sheets:
+                if sheet_name in wb.sheetnames:
+                    print(f"Hoja {sheet_name} ya existe, sobrescribiendo...")
+                    wb.remove(wb[sheet_name])
+        else:
+            print(f"Creando nuevo archivo para {employee_name}...")
+            wb = Workbook()
+            wb.remove(wb.active)
+        
+        # Clone the precompiled layout and fill only the data cells
+        for sheet_name, month_name, projects_by_day in sheets:
+            with self.timer.phase('render'):
+                ws = template.render(wb, sheet_name)
+            with self.timer.phase('fill_worksheet'):
+                self.fill_worksheet(ws, employee_name, projects_by_day, dieta_amount, month_name, year)
         
-        # Merge cells for declaration text
-        ws.merge_cells(f'A{declaration_row}:H{declaration_row + 3}')
+        # Save file once for all of the year's months
+        with self.timer.phase('save'):
+            self.file_writer.save(file_path, wb.save)
+        print(f"Archivo guardado: {file_path}")
         
-        # Set row height for declaration to accommodate text
-        for row_offset in range(4):  # 4 filas para el texto
-            ws.row_dimensions[declaration_row + row_offset].height = 30
+        return file_path
     
-    def apply_formatting(self, ws):
-        """Apply formatting to the worksheet"""
-        # Bold headers
-        bold_font = Font(bold=True)
-        
-        # Header formatting
-        for cell in ['A1', 'C1', 'E1', 'F1', 'A2', 'C2', 'E2', 'F2']:
-            ws[cell].font = bold_font
-        
-        # Table headers formatting
-        for col in range(1, 9):
-            cell = ws.cell(row=5, column=col)
-            cell.font = bold_font
-            cell.alignment = Alignment(horizontal='center')
-        
-        # Border for table
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
+    def write_streaming_workbook(self, file_path: str, sheets: List[Tuple[str, Dict[Tuple[int, int], object]]]):
+        """Write a new workbook straight into a zip stream, one template sheet per (title, values)"""
+        from utils.xlsx_writer import get_stream_writer
+        writer = get_stream_writer(self.template_path)
+        self.file_writer.save(file_path, lambda staged_path: writer.write(staged_path, sheets))
+    
+    def update_streaming_workbook(self, file_path: str, sheets: List[Tuple[str, Dict[Tuple[int, int], object]]]):
+        """Add or replace template sheets in an existing workbook without loading its other sheets"""
+        from utils.xlsx_writer import get_stream_writer
+        from utils.xlsx_patch import upsert_sheets
+        writer = get_stream_writer(self.template_path)
+        sheet_xmls = [(sheet_name, writer.sheet_xml(values)) for sheet_name, values in sheets]
+        self.file_writer.save(
+            file_path,
+            lambda staged_path: upsert_sheets(file_path, sheet_xmls, writer.styles_xml, staged_path)
         )
+    
+    def fill_worksheet(self, ws, employee_name: str, projects_by_day: Dict[int, str], dieta_amount: float, month_name: str, year: int):
+        """Fill the data cells of a worksheet cloned from the template"""
+        values = self.sheet_values(employee_name, projects_by_day, dieta_amount, month_name, year)
+        for (row, column), value in values.items():
+            ws.cell(row=row, column=column, value=value)
+    
+    def sheet_values(self, employee_name: str, projects_by_day: Dict[int, str], dieta_amount: float, month_name: str, year: int) -> Dict[Tuple[int, int], object]:
+        """Data cells of a month sheet as {(row, column): value}"""
+        values = {}
         
-        # Apply borders to data table (rows 5 to 37)
-        for row in range(5, 38):  # Incluye hasta row 37
-            for col in range(1, 9):
-                ws.cell(row=row, column=col).border = thin_border
-        
-        # Center alignment for date column
-        for row in range(6, 37):  # B6 a B36
-            ws.cell(row=row, column=1).alignment = Alignment(horizontal='center')
-        
-        # Right alignment for monetary values
-        for row in range(6, 38):  # Incluye hasta row 37
-            for col in range(2, 7):
-                ws.cell(row=row, column=col).alignment = Alignment(horizontal='right')
+        # Header section
+        values[(1, 3)] = month_name.upper()  # C1
+        values[(1, 6)] = year                # F1
         
-        # Bold formatting for total rows
-        for col in range(1, 9):
-            ws.cell(row=37, column=col).font = bold_font  # Total row
+        values[(2, 3)] = employee_name       # C2
+        values[(2, 6)] = dieta_amount        # F2
         
-        ws.cell(row=39, column=4).font = bold_font  # "Total:" label
-        ws.cell(row=39, column=5).font = bold_font  # Grand total value
+        # Fill days (rows 6 to 36); the day numbers already come from the template
+        for day in sorted(projects_by_day):
+            row_num = day + 5  # día 1 = fila 6, día 31 = fila 36
+            # Para días de trabajo: B=F2, C,D,E,F=0, G=proyecto
+            values[(row_num, 2)] = '=$F$2'  # DIETAS = F2
+            values[(row_num, 3)] = 0        # ALOJAMIENTO = 0
+            values[(row_num, 4)] = 0        # GASOIL = 0
+            values[(row_num, 5)] = 0        # KM = 0
+            values[(row_num, 6)] = 0        # PEAJE = 0
+            values[(row_num, 7)] = projects_by_day[day]  # OBRA
         
-        # Adjust column widths
-        column_widths = [8, 12, 15, 12, 8, 12, 30, 15]
-        for i, width in enumerate(column_widths, 1):
-            ws.column_dimensions[chr(64 + i)].width = width
-            
+        return values
+    
     def months_to_spanish(self, month: str) -> str:
         """Convert English month name to Spanish"""
         months = {
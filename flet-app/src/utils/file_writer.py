@@ -0,0 +1,237 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, List, Optional, Tuple
+from zipfile import ZipFile, ZIP_STORED
+
+# none: sin fsync (el sistema decide cuándo escribir); file: fsync del archivo antes de renombrarlo;
+# full: además fsync de la carpeta tras el renombrado, para que el cambio sobreviva a un corte de luz
+FSYNC_MODES = ('none', 'file', 'full')
+DEFAULT_FSYNC = 'file'
+
+# Copias simultáneas al destino al confirmar un lote si no se indica otro límite
+DEFAULT_BATCH_WRITES = 4
+
+COPY_BUFFER = 1024 * 1024
+
+# Semáforo entre procesos que comparten los workers del pool (ver share_write_limit)
+_shared_write_limit = None
+
+
+def share_write_limit(semaphore):
+    """Process pool initializer: make every writer in this process use one cross-process write limit"""
+    global _shared_write_limit
+    _shared_write_limit = semaphore
+
+
+def fsync_path(path: str):
+    """Flush a file's data to disk"""
+    with open(path, 'ab') as file:
+        os.fsync(file.fileno())
+
+
+def fsync_folder(folder: str):
+    """Flush a folder's entries (the rename itself) to disk, where the platform allows it"""
+    if not hasattr(os, 'O_DIRECTORY'):  # Windows
+        return
+    handle = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(handle)
+    except OSError:
+        pass  # algunos sistemas de archivos de red no lo admiten
+    finally:
+        os.close(handle)
+
+
+def save_atomically(file_path: str, save: Callable[[str], None], fsync: str = 'none'):
+    """Write through a temporary file in the same folder and swap it in, so a file is never half-written"""
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        save(temp_path)
+        if fsync != 'none':
+            fsync_path(temp_path)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if fsync == 'full':
+        fsync_folder(os.path.dirname(os.path.abspath(file_path)))
+
+
+class AtomicFileWriter:
+    """Write output files to a local staging folder, then move them into place atomically
+
+    A file is built entirely in staging_dir (the system temp folder by
+    default), so a slow destination such as a network share only sees one
+    sequential copy, and a crash mid-save never touches the existing file: the
+    copy goes to a temporary name next to it and is renamed over it at the end.
+
+    With batch=True files stay staged until commit_all(), which moves the whole
+    run into place at once. max_concurrent caps how many files are copied to the
+    destination at the same time; fsync is one of FSYNC_MODES.
+    """
+
+    def __init__(self, fsync: str = DEFAULT_FSYNC, staging_dir: Optional[str] = None, batch: bool = False,
+                 max_concurrent: Optional[int] = None):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"Modo fsync desconocido: {fsync} (opciones: {', '.join(FSYNC_MODES)})")
+        self.fsync = fsync
+        self.staging_dir = staging_dir
+        self.batch = batch
+        self.max_concurrent = max_concurrent
+        self.limit = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self.pending: List[Tuple[str, str]] = []  # (staged path, destination) esperando a commit_all
+        self.bytes_written = 0
+        self._staging_folder = None
+        self._staged_count = 0
+
+    def staging_path(self, file_path: str) -> str:
+        """A fresh path in this writer's private staging folder"""
+        if self._staging_folder is None or not os.path.isdir(self._staging_folder):
+            if self.staging_dir:
+                os.makedirs(self.staging_dir, exist_ok=True)
+            self._staging_folder = tempfile.mkdtemp(prefix='nova_dietas_', dir=self.staging_dir)
+        self._staged_count += 1
+        return os.path.join(self._staging_folder, f"{self._staged_count}_{os.path.basename(file_path)}")
+
+    def save(self, file_path: str, save: Callable[[str], None]) -> str:
+        """Build file_path through save(staged_path) and move it into place (or queue it in batch mode)"""
+        staged_path = self.staging_path(file_path)
+        try:
+            save(staged_path)
+        except BaseException:
+            discard(staged_path)
+            raise
+        self.bytes_written += os.path.getsize(staged_path)
+
+        if self.batch:
+            self.pending.append((staged_path, file_path))
+        else:
+            self.commit(staged_path, file_path)
+        return file_path
+
+    def exists(self, file_path: str) -> bool:
+        return os.path.exists(file_path)
+
+    def write_slot(self):
+        """Context manager holding one of the destination's concurrent write slots"""
+        return _shared_write_limit or self.limit or nullcontext()
+
+    def commit(self, staged_path: str, file_path: str):
+        """Move a staged file over file_path; the existing file is replaced only once the copy is complete"""
+        folder = os.path.dirname(os.path.abspath(file_path))
+        try:
+            with self.write_slot():
+                if os.stat(staged_path).st_dev == os.stat(folder).st_dev:
+                    # Mismo sistema de archivos: basta con renombrar
+                    if self.fsync != 'none':
+                        fsync_path(staged_path)
+                    os.replace(staged_path, file_path)
+                else:
+                    save_atomically(file_path, lambda temp_path: self.copy(staged_path, temp_path))
+                if self.fsync == 'full':
+                    fsync_folder(folder)
+        finally:
+            discard(staged_path)
+
+    def copy(self, source: str, target: str):
+        with open(source, 'rb') as reader, open(target, 'wb') as writer:
+            shutil.copyfileobj(reader, writer, COPY_BUFFER)
+            if self.fsync != 'none':
+                writer.flush()
+                os.fsync(writer.fileno())
+
+    def commit_all(self, staged: Optional[List[Tuple[str, str]]] = None) -> List[Tuple[str, str]]:
+        """Move every pending (staged, destination) pair into place; returns (destination, error) failures
+
+        staged defaults to this writer's own queue; pairs staged by worker
+        processes can be passed in explicitly.
+        """
+        if staged is None:
+            staged, self.pending = self.pending, []
+        failures = []
+        if not staged:
+            return failures
+
+        def commit_one(pair: Tuple[str, str]):
+            staged_path, file_path = pair
+            try:
+                self.commit(staged_path, file_path)
+            except Exception as e:
+                print(f"Error moviendo {file_path} a su destino: {e}")
+                failures.append((file_path, str(e)))
+
+        # El límite de escrituras simultáneas ya lo aplica commit(); aquí solo se reparten los hilos
+        with ThreadPoolExecutor(max_workers=self.max_concurrent or DEFAULT_BATCH_WRITES) as executor:
+            list(executor.map(commit_one, staged))
+        return failures
+
+    def discard_pending(self):
+        """Drop every staged file that was not committed"""
+        for staged_path, _ in self.pending:
+            discard(staged_path)
+        self.pending = []
+
+
+def discard(staged_path: str):
+    """Remove a staged file and its staging folder once empty"""
+    if os.path.exists(staged_path):
+        os.remove(staged_path)
+    try:
+        os.rmdir(os.path.dirname(staged_path))
+    except OSError:
+        pass  # aún quedan archivos en preparación
+
+
+class ZipBundleWriter:
+    """Drop-in for AtomicFileWriter that turns every saved file into an entry of one ZIP stream
+
+    Each workbook is written straight into its entry as it is produced, so
+    only the workbook being built is held in memory and nothing touches the
+    disk unless target is a file. Workbooks are already deflate-compressed
+    zips, so entries are stored as is rather than compressed a second time.
+    """
+
+    batch = False
+
+    def __init__(self, target):
+        self.archive = ZipFile(target, 'w', ZIP_STORED, allowZip64=True)
+        self.pending: List[Tuple[str, str]] = []
+        self.bytes_written = 0
+        self.names: List[str] = []
+        self._used_names = set()
+
+    def entry_name(self, file_path: str) -> str:
+        """ZIP entry for file_path: its file name, numbered when another entry already has it in any case"""
+        name = os.path.basename(file_path)
+        stem, extension = os.path.splitext(name)
+        copy = 1
+        # Al descomprimir en Windows o macOS, nombres que solo difieren en mayúsculas chocarían
+        while name.casefold() in self._used_names:
+            copy += 1
+            name = f"{stem} ({copy}){extension}"
+        self._used_names.add(name.casefold())
+        return name
+
+    def exists(self, file_path: str) -> bool:
+        return False  # el paquete siempre empieza vacío
+
+    def save(self, file_path: str, save: Callable[[object], None]) -> str:
+        """Write file_path as a ZIP entry named after its file name; save receives a writable stream"""
+        name = self.entry_name(file_path)
+        with self.archive.open(name, 'w', force_zip64=True) as entry:
+            save(entry)
+        self.bytes_written += self.archive.getinfo(name).file_size
+        self.names.append(name)
+        return file_path
+
+    def commit_all(self, staged: Optional[List[Tuple[str, str]]] = None) -> List[Tuple[str, str]]:
+        return []
+
+    def close(self):
+        """Write the ZIP central directory; the target stream itself is left open"""
+        self.archive.close()
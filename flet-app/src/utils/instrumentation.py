@@ -0,0 +1,147 @@
+import cProfile
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Empleados más lentos que se listan en el informe (y cuyos perfiles se conservan)
+SLOWEST_EMPLOYEES = 10
+KEPT_PROFILES = 3
+
+
+class PhaseTimer:
+    """Accumulate wall time per named phase (parse, group, load, fill, save...)"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def merge(self, phases: Dict[str, float]):
+        for name, seconds in phases.items():
+            self.add(name, seconds)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process alone, in MB (None if unavailable)
+
+    Worker processes report their own peak in their task stats; RUSAGE_CHILDREN
+    is not used because it is the largest single finished child, not a total.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(usage / divisor, 1)
+
+
+class EmployeeProfiler:
+    """Opt-in cProfile + tracemalloc capture of one employee task, written to profile_dir"""
+
+    def __init__(self, profile_dir: str, employee_name: str):
+        safe_name = re.sub(r'[^\w.-]+', '_', employee_name).strip('_') or 'empleado'
+        self.profile_path = os.path.join(profile_dir, f"{safe_name}.prof")
+        self.memory_path = os.path.join(profile_dir, f"{safe_name}.mem.txt")
+        self.profiler = cProfile.Profile()
+        self.peak_traced_bytes = 0
+
+    def __enter__(self):
+        tracemalloc.start()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        self.peak_traced_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        self.profiler.dump_stats(self.profile_path)
+        with open(self.memory_path, 'w', encoding='utf-8') as file:
+            file.write(f"peak traced memory: {self.peak_traced_bytes} bytes\n")
+            for stat in snapshot.statistics('lineno')[:20]:
+                file.write(f"{stat}\n")
+
+
+def keep_slowest_profiles(employee_stats: List[Dict], kept: int = KEPT_PROFILES) -> List[str]:
+    """Delete the profiles of all but the slowest employees and return the kept paths"""
+    ranked = sorted((stats for stats in employee_stats if stats.get('profile')), key=lambda stats: -stats['seconds'])
+    kept_paths = []
+    for position, stats in enumerate(ranked):
+        paths = [stats['profile'], stats['memory_profile']]
+        if position < kept:
+            kept_paths.extend(paths)
+            continue
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+    return kept_paths
+
+
+def build_report(timer: PhaseTimer, employee_stats: List[Dict], **summary) -> Dict:
+    """Structured report of a generation run, ready for json.dumps
+
+    Two kinds of timings are kept apart: phases is the wall time of the run's
+    own steps in this process, employee_phases the time inside employee
+    tasks summed over every task (so over all workers, in parallel). Likewise
+    peak_rss_mb is this process's peak and worker_peak_rss_mb the largest
+    peak any process reached while running a task.
+    """
+    ranked = sorted(employee_stats, key=lambda stats: -stats['seconds'])
+    task_timer = PhaseTimer()
+    for stats in employee_stats:
+        task_timer.merge(stats['phases'])
+    worker_peaks = [stats['peak_rss_mb'] for stats in employee_stats if stats.get('peak_rss_mb') is not None]
+    report = dict(summary)
+    report.update({
+        'phases': {name: round(seconds, 4) for name, seconds in timer.phases.items()},
+        'employee_phases': {name: round(seconds, 4) for name, seconds in task_timer.phases.items()},
+        'bytes_written': sum(stats['bytes'] for stats in employee_stats),
+        'peak_rss_mb': peak_rss_mb(),
+        'worker_peak_rss_mb': max(worker_peaks) if worker_peaks else None,
+        'slowest_employees': [
+            {key: stats[key] for key in ('employee', 'seconds', 'sheets', 'bytes')}
+            for stats in ranked[:SLOWEST_EMPLOYEES]
+        ],
+        'employee_seconds': {stats['employee']: stats['seconds'] for stats in employee_stats},
+    })
+    return report
+
+
+def format_report(report: Dict) -> str:
+    """One-line human summary of a report for the UI"""
+    phases = ' · '.join(f"{name} {seconds:.2f}s" for name, seconds in report['phases'].items())
+    size_mb = report['bytes_written'] / (1024 * 1024)
+    text = f"{phases} · {size_mb:.1f} MB escritos"
+    employee_phases = report.get('employee_phases')
+    if employee_phases:
+        # Suma de todos los empleados: con varios procesos supera el tiempo real
+        text += " · por empleado (suma): " + ' · '.join(
+            f"{name} {seconds:.2f}s" for name, seconds in employee_phases.items()
+        )
+    if report.get('peak_rss_mb') is not None:
+        text += f" · pico {report['peak_rss_mb']:.0f} MB"
+        if report.get('worker_peak_rss_mb') is not None and report.get('workers', 1) > 1:
+            text += f" (procesos hijos {report['worker_peak_rss_mb']:.0f} MB)"
+    return text
+
+
+def report_json(report: Dict) -> str:
+    return json.dumps(report, ensure_ascii=False, indent=2)
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Optional
+
+from utils.file_writer import save_atomically
+
+MANIFEST_NAME = '.gastos_manifest.json'
+MANIFEST_VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def template_identity(template_path: Optional[str] = None) -> str:
+    """Hash of the sheet layout: the template file, or the modules that build the default skeleton"""
+    if template_path:
+        sources = [template_path]
+    else:
+        from utils import sheet_template, styles
+        sources = [sheet_template.__file__, styles.__file__]
+
+    digest = hashlib.sha256()
+    for source in sources:
+        with open(source, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 16), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def slice_hash(employee_name: str, year: int, month_num: int, projects_by_day: Dict[int, str],
+               dieta_amount: float, template_id: str) -> str:
+    """Content hash of the inputs of one employee month sheet"""
+    payload = json.dumps(
+        [employee_name.upper(), year, month_num, float(dieta_amount), sorted(projects_by_day.items()), template_id],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class GenerationManifest:
+    """Hashes of the (employee, month, dieta) slices already written to an output folder
+
+    Stored as a small JSON file inside the output folder. A sheet whose input
+    hash matches the manifest, and whose file still exists, does not need to
+    be regenerated.
+    """
+
+    def __init__(self, output_folder: str):
+        self.path = os.path.join(output_folder, MANIFEST_NAME)
+        self.entries = {}
+        self.load()
+
+    @staticmethod
+    def key(employee_name: str, year: int, month_num: int) -> str:
+        return f"{employee_name.upper()}|{year}-{month_num:02d}"
+
+    def load(self):
+        """Read the manifest; a missing or unreadable one just means everything is regenerated"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                content = json.load(file)
+            if content.get('version') == MANIFEST_VERSION:
+                self.entries = dict(content.get('sheets', {}))
+        except (OSError, ValueError, AttributeError) as e:
+            if os.path.exists(self.path):
+                print(f"Manifiesto ilegible, se regenerará todo: {e}")
+            self.entries = {}
+
+    def is_current(self, key: str, digest: str) -> bool:
+        return self.entries.get(key) == digest
+
+    def update(self, key: str, digest: str):
+        self.entries[key] = digest
+
+    def save(self):
+        """Write the manifest atomically so an interrupted run never leaves it half-written"""
+        def write(temp_path: str):
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump({'version': MANIFEST_VERSION, 'sheets': self.entries}, file, ensure_ascii=False,
+                          indent=0, sort_keys=True)
+
+        save_atomically(self.path, write)
@@ -0,0 +1,238 @@
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import NamedStyle
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.worksheet.page import PageMargins
+from copy import copy
+from functools import lru_cache
+from typing import Optional
+from utils import styles
+
+# Los formatos numéricos personalizados empiezan en este id (los anteriores son built-in)
+BUILTIN_NUMBER_FORMATS = 164
+
+PAGE_SETUP_FIELDS = ('paperSize', 'orientation', 'fitToWidth', 'fitToHeight', 'scale')
+
+# Celdas que se rellenan por empleado/mes: mes, año, nombre y dieta, y las columnas B-G de los días.
+# De una plantilla de usuario solo se conserva su formato: un libro ya generado usado como
+# plantilla traería los datos de otra persona (p. ej. dietas en días no trabajados)
+DATA_HEADER_CELLS = {(1, 3), (1, 6), (2, 3), (2, 6)}
+DAY_ROWS = range(6, 37)
+DAY_DATA_COLUMNS = range(2, 8)
+
+
+def is_data_cell(row: int, column: int) -> bool:
+    return (row, column) in DATA_HEADER_CELLS or (row in DAY_ROWS and column in DAY_DATA_COLUMNS)
+
+
+class SheetTemplate:
+    """Precompiled monthly sheet layout
+
+    The styled skeleton (labels, bordered grid, alignments, declaration block,
+    column widths and A4 page setup) is built once, or read from a .xlsx
+    template file, and then cloned into every new month sheet. Only the data
+    cells have to be written per employee/month afterwards.
+    """
+
+    def __init__(self, template_path: Optional[str] = None):
+        self.template_path = template_path
+
+        if template_path:
+            self.workbook = load_workbook(template_path)
+            self.worksheet = self.workbook.worksheets[0]
+        else:
+            self.workbook = Workbook()
+            self.worksheet = self.workbook.active
+            self.build_skeleton(self.worksheet)
+
+        # Snapshot of every non-empty or styled cell: (row, column, value, style); data cells keep only their style
+        self.cells = [
+            (cell.row, cell.column, None if is_data_cell(cell.row, cell.column) else cell.value,
+             StyleArray(cell._style or StyleArray()))
+            for row in self.worksheet.iter_rows()
+            for cell in row
+            if cell.value is not None or cell.has_style
+        ]
+
+    def render(self, wb, title: str):
+        """Create a new worksheet in wb as a copy of the template"""
+        ws = wb.create_sheet(title=title)
+        src = self.worksheet
+
+        # Traducir cada estilo distinto una sola vez al libro de destino
+        styles = {}
+        for row, column, value, style in self.cells:
+            target_style = styles.get(style)
+            if target_style is None:
+                target_style = styles[style] = self.translate_style(style, wb)
+            cell = ws.cell(row=row, column=column)
+            if value is not None:
+                cell.value = value
+            cell._style = copy(target_style)
+
+        for merged_range in src.merged_cells.ranges:
+            ws.merge_cells(merged_range.coord)
+
+        for key, dimension in src.column_dimensions.items():
+            if dimension.width:
+                ws.column_dimensions[key].width = dimension.width
+
+        for key, dimension in src.row_dimensions.items():
+            if dimension.height:
+                ws.row_dimensions[key].height = dimension.height
+
+        for field in PAGE_SETUP_FIELDS:
+            setattr(ws.page_setup, field, getattr(src.page_setup, field))
+        ws.page_margins = copy(src.page_margins)
+        ws.sheet_properties.pageSetUpPr = copy(src.sheet_properties.pageSetUpPr)
+
+        return ws
+
+    def translate_style(self, style: StyleArray, wb) -> StyleArray:
+        """Register the template style components in wb and return the matching style array"""
+        src = self.workbook
+        target = StyleArray()
+        target.fontId = wb._fonts.add(src._fonts[style.fontId])
+        target.fillId = wb._fills.add(src._fills[style.fillId])
+        target.borderId = wb._borders.add(src._borders[style.borderId])
+        target.alignmentId = wb._alignments.add(src._alignments[style.alignmentId])
+        target.protectionId = wb._protections.add(src._protections[style.protectionId])
+
+        if style.numFmtId < BUILTIN_NUMBER_FORMATS:
+            target.numFmtId = style.numFmtId
+        else:
+            number_format = src._number_formats[style.numFmtId - BUILTIN_NUMBER_FORMATS]
+            target.numFmtId = wb._number_formats.add(number_format) + BUILTIN_NUMBER_FORMATS
+
+        if style.xfId:
+            target.xfId = self.translate_named_style(src._named_styles[style.xfId], wb)
+        
+        target.pivotButton = style.pivotButton
+        target.quotePrefix = style.quotePrefix
+        return target
+
+    def translate_named_style(self, named_style: NamedStyle, wb) -> int:
+        """Register a template named style in wb (once, by name) and return its index there"""
+        if named_style.name not in wb.named_styles:
+            wb.add_named_style(NamedStyle(
+                name=named_style.name,
+                font=named_style.font,
+                fill=named_style.fill,
+                border=named_style.border,
+                alignment=named_style.alignment,
+                number_format=named_style.number_format,
+                protection=named_style.protection,
+                builtinId=named_style.builtinId
+            ))
+        return wb._named_styles.names.index(named_style.name)
+    
+    def build_skeleton(self, ws):
+        """Build the fixed part of the monthly sheet: labels, formulas and formatting"""
+
+        # Header section
+        ws['A1'] = 'MES'
+        ws['E1'] = 'AÑO'
+        ws['A2'] = 'NOMBRE'
+        ws['E2'] = 'VALOR'
+
+        # Table headers (row 5)
+        headers = ['Fecha', 'DIETAS', 'ALOJAMIENTO', 'GASOIL', 'KM', 'PEAJE', 'OBRA', 'FIRMA']
+        for col, header in enumerate(headers, 1):
+            ws.cell(row=5, column=col, value=header)
+
+        # Day numbers (rows 6 to 36)
+        for day in range(1, 32):  # Días 1 a 31 (filas 6 a 36)
+            ws.cell(row=day + 5, column=1, value=day)
+
+        # Total row (row 37)
+        total_row = 37
+        ws.cell(row=total_row, column=1, value='TOTAL')
+
+        # Totales con fórmulas de suma de B6:B36, C6:C36, etc.
+        ws.cell(row=total_row, column=2, value='=SUM(B6:B36)')  # DIETAS
+        ws.cell(row=total_row, column=3, value='=SUM(C6:C36)')  # ALOJAMIENTO
+        ws.cell(row=total_row, column=4, value='=SUM(D6:D36)')  # GASOIL
+        ws.cell(row=total_row, column=5, value='=SUM(E6:E36)')  # KM
+        ws.cell(row=total_row, column=6, value='=SUM(F6:F36)')  # PEAJE
+
+        # Gran total en E39 (suma de B37:F37)
+        grand_total_row = 39
+        ws.cell(row=grand_total_row, column=4, value='Total:')
+        ws.cell(row=grand_total_row, column=5, value=f'=SUM(B{total_row}:F{total_row})')
+
+        # Footer sections
+        received_row = grand_total_row + 2
+        ws.cell(row=received_row, column=1, value='Recibí:')
+
+        date_row = received_row + 6
+        ws.cell(row=date_row, column=1, value='Fecha:')
+
+        # Declaration text with wrap text
+        declaration_row = date_row + 2
+        declaration_text = ("El trabajador declara que los días señalados en cada una de las fechas consignadas en este documento "
+                          "realizó todas y cada una de las rutas y desplazamientos, e incurrió en los gastos que se indican para "
+                          "cada una de ellas, en ejercicio de su cargo y/o actividad laboral, validando con esta firma la totalidad "
+                          "de las mismas. Y para que conste firma el presente documento en la fecha señalada.")
+
+        # Configure the declaration cell with wrap text
+        ws.cell(row=declaration_row, column=1, value=declaration_text)
+        styles.register_named_styles(ws.parent)
+        styles.apply_named_style(ws, f'A{declaration_row}', styles.DECLARATION)
+
+        # Merge cells for declaration text
+        ws.merge_cells(f'A{declaration_row}:H{declaration_row + 3}')
+
+        # Set row height for declaration to accommodate text
+        for row_offset in range(4):  # 4 filas para el texto
+            ws.row_dimensions[declaration_row + row_offset].height = 30
+
+        self.apply_formatting(ws)
+
+        # Configure page setup for A4 format
+        ws.page_setup.paperSize = ws.PAPERSIZE_A4
+        ws.page_setup.orientation = ws.ORIENTATION_PORTRAIT
+        ws.page_setup.fitToWidth = 1
+        ws.page_setup.fitToHeight = 0  # 0 = automático
+
+        # Configure page margins (1 cm = 0.393701 inches)
+        ws.page_margins = PageMargins(
+            left=0.393701,   # 1 cm
+            right=0.393701,  # 1 cm
+            top=0.393701,    # 1 cm
+            bottom=0.393701, # 1 cm
+            header=0,        # Sin encabezado
+            footer=0         # Sin pie de página
+        )
+
+    def apply_formatting(self, ws):
+        """Apply formatting to the worksheet through the shared named styles"""
+        styles.register_named_styles(ws.parent)
+        
+        # Header formatting
+        for cell in ['A1', 'C1', 'E1', 'F1', 'A2', 'C2', 'E2', 'F2']:
+            styles.apply_named_style(ws, cell, styles.BOLD)
+        
+        # Table headers: bold, centered and bordered
+        styles.apply_named_style(ws, 'A5:H5', styles.TABLE_HEADER)
+        
+        # Day grid (rows 6 to 36): centered dates, right-aligned amounts, bordered text cells
+        styles.apply_named_style(ws, 'A6:A36', styles.DAY)
+        styles.apply_named_style(ws, 'B6:F36', styles.AMOUNT)
+        styles.apply_named_style(ws, 'G6:H36', styles.TABLE_CELL)
+        
+        # Total row (row 37)
+        styles.apply_named_style(ws, 'A37', styles.TOTAL)
+        styles.apply_named_style(ws, 'B37:F37', styles.TOTAL_AMOUNT)
+        styles.apply_named_style(ws, 'G37:H37', styles.TOTAL)
+        
+        styles.apply_named_style(ws, 'D39:E39', styles.BOLD)  # "Total:" label and grand total value
+        
+        # Adjust column widths
+        column_widths = [8, 12, 15, 12, 8, 12, 30, 15]
+        for i, width in enumerate(column_widths, 1):
+            ws.column_dimensions[chr(64 + i)].width = width
+
+
+@lru_cache(maxsize=None)
+def get_template(template_path: Optional[str] = None) -> SheetTemplate:
+    """Return the process-wide template for template_path, building it on first use"""
+    return SheetTemplate(template_path)
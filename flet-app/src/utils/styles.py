@@ -0,0 +1,55 @@
+from openpyxl.styles import Font, Alignment, Border, Side, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.utils.cell import range_boundaries
+from copy import copy
+from typing import Dict
+
+# Piezas de estilo compartidas: los objetos de estilo de openpyxl son inmutables
+# en la práctica, así que una sola instancia sirve para todas las hojas y libros
+BOLD_FONT = Font(bold=True)
+THIN_SIDE = Side(style='thin')
+THIN_BORDER = Border(left=THIN_SIDE, right=THIN_SIDE, top=THIN_SIDE, bottom=THIN_SIDE)
+CENTER = Alignment(horizontal='center')
+RIGHT = Alignment(horizontal='right')
+DECLARATION_ALIGNMENT = Alignment(horizontal='justify', vertical='top', wrap_text=True)
+
+# Named styles of the monthly sheet, by name
+BOLD = 'Gastos Negrita'
+TABLE_HEADER = 'Gastos Encabezado'
+DAY = 'Gastos Día'
+AMOUNT = 'Gastos Importe'
+TABLE_CELL = 'Gastos Celda'
+TOTAL = 'Gastos Total'
+TOTAL_AMOUNT = 'Gastos Importe Total'
+DECLARATION = 'Gastos Declaración'
+
+NAMED_STYLES: Dict[str, Dict] = {
+    BOLD: {'font': BOLD_FONT},
+    TABLE_HEADER: {'font': BOLD_FONT, 'alignment': CENTER, 'border': THIN_BORDER},
+    DAY: {'alignment': CENTER, 'border': THIN_BORDER},
+    AMOUNT: {'alignment': RIGHT, 'border': THIN_BORDER},
+    TABLE_CELL: {'border': THIN_BORDER},
+    TOTAL: {'font': BOLD_FONT, 'border': THIN_BORDER},
+    TOTAL_AMOUNT: {'font': BOLD_FONT, 'alignment': RIGHT, 'border': THIN_BORDER},
+    DECLARATION: {'alignment': DECLARATION_ALIGNMENT},
+}
+
+
+def register_named_styles(wb):
+    """Add the sheet's named styles to wb once; NamedStyle objects bind to a single workbook"""
+    for name, parts in NAMED_STYLES.items():
+        if name not in wb.named_styles:
+            # Lo que el estilo no define queda como en una celda sin formato
+            parts = {'font': DEFAULT_FONT, 'border': DEFAULT_BORDER, **parts}
+            wb.add_named_style(NamedStyle(name=name, **parts))
+
+
+def apply_named_style(ws, cell_range: str, name: str):
+    """Apply a registered named style to every cell of a range such as 'A6:A36' or 'D39'"""
+    # Un único StyleArray por estilo; cada celda recibe una copia, sin pasar por la deduplicación
+    style = ws.parent._named_styles[name].as_tuple()
+    min_col, min_row, max_col, max_row = range_boundaries(cell_range)
+    for row in ws.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+        for cell in row:
+            cell._style = copy(style)
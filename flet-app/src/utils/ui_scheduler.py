@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+import weakref
+from typing import Callable, Dict, Optional, Tuple
+
+# Como mucho una actualización de la página por fotograma (~60 por segundo)
+FRAME_SECONDS = 1 / 60
+
+# Espera tras la última pulsación antes de validar un campo
+DEBOUNCE_SECONDS = 0.3
+
+# Tiempo durante el que se reutiliza la comprobación de una carpeta
+FOLDER_STATUS_TTL = 5.0
+
+
+class PageUpdateScheduler:
+    """Coalesce page.update() calls: however many controls change within a frame, the page is sent once
+
+    Holds the page weakly, so a closed web session's page (and everything
+    reachable from its controls) can still be collected.
+    """
+
+    def __init__(self, page, frame_seconds: float = FRAME_SECONDS):
+        self.page_ref = weakref.ref(page)
+        self.frame_seconds = frame_seconds
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def request(self):
+        """Schedule an update at the end of the current frame, unless one is already pending"""
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.frame_seconds, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Send the pending changes now"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        page = self.page_ref()
+        if page is None:
+            return
+        try:
+            page.update()
+        except Exception as e:
+            # Corre en un hilo del temporizador: la sesión puede haberse desconectado entretanto
+            print(f"No se pudo actualizar la página: {e}")
+
+
+_schedulers = weakref.WeakKeyDictionary()
+_schedulers_lock = threading.Lock()
+
+
+def request_update(page):
+    """Coalesced page.update(): every component of a page shares one scheduler"""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(page)
+        if scheduler is None:
+            scheduler = _schedulers[page] = PageUpdateScheduler(page)
+    scheduler.request()
+
+
+class Debouncer:
+    """Run callback on a background thread once calls have stopped arriving for delay seconds"""
+
+    def __init__(self, callback: Callable[[], None], delay: float = DEBOUNCE_SECONDS):
+        self.callback = callback
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def call(self, delay: Optional[float] = None):
+        """(Re)start the countdown; delay=0 runs the callback right away, still off the calling thread"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay if delay is None else delay, self.callback)
+            self._timer.daemon = True
+            self._timer.start()
+
+
+class FolderStatusCache:
+    """os.path.isdir results kept for a few seconds, so slow network paths are checked once per burst"""
+
+    def __init__(self, ttl: float = FOLDER_STATUS_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, bool]] = {}
+        self._lock = threading.Lock()
+
+    def is_dir(self, path: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry and now - entry[0] < self.ttl:
+            return entry[1]
+
+        is_dir = os.path.isdir(path)
+        with self._lock:
+            self._entries[path] = (time.monotonic(), is_dir)
+        return is_dir
+
+    def invalidate(self, path: Optional[str] = None):
+        """Forget one path (e.g. a folder just created), or every path"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
@@ -0,0 +1,37 @@
+import os
+import secrets
+import shutil
+import time
+from typing import Tuple
+
+# Carpeta de recursos que Flet sirve al navegador en modo web (ft.app(assets_dir=...))
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+DOWNLOADS_FOLDER = 'descargas'
+
+# Las descargas se borran pasado este tiempo
+DOWNLOAD_TTL = 60 * 60
+
+
+def new_download(file_name: str, assets_dir: str = ASSETS_DIR) -> Tuple[str, str]:
+    """(path to write, URL the browser fetches) of a new download; expired downloads are removed first
+
+    Each download gets its own folder named by a random token, so one user
+    cannot guess another user's URL.
+    """
+    downloads_dir = os.path.join(assets_dir, DOWNLOADS_FOLDER)
+    prune_downloads(downloads_dir)
+    token = secrets.token_urlsafe(16)
+    os.makedirs(os.path.join(downloads_dir, token))
+    return os.path.join(downloads_dir, token, file_name), f"/{DOWNLOADS_FOLDER}/{token}/{file_name}"
+
+
+def prune_downloads(downloads_dir: str, ttl: float = DOWNLOAD_TTL):
+    if not os.path.isdir(downloads_dir):
+        return
+    limit = time.time() - ttl
+    for entry in os.scandir(downloads_dir):
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < limit:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass  # otra sesión la está borrando
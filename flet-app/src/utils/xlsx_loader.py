@@ -0,0 +1,124 @@
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.csv_engines import normalize_headers
+from utils.csv_loader import DEFAULT_CHUNK_SIZE, EXPECTED_HEADERS, CSVFormatError, new_content_hash
+from utils.records import Record, make_records
+
+# Filas del principio de cada hoja donde se busca la cabecera (puede haber títulos encima)
+HEADER_SEARCH_ROWS = 20
+
+
+def cell_text(value) -> str:
+    """A cell value as the text the CSV export would have had"""
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%d/%m/%Y')
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class XLSXChunkLoader:
+    """Stream the records of a nombre,proyecto,fecha sheet of an .xlsx workbook
+
+    Drop-in replacement for CSVChunkLoader: iterating yields lists of at most
+    chunk_size Record tuples, read with openpyxl in read-only mode so memory
+    stays flat however large the workbook is.
+
+    sheet picks the worksheet by name; by default the first one whose header
+    row (within its first HEADER_SEARCH_ROWS rows) has the three columns.
+    columns maps nombre/proyecto/fecha to the workbook's own header names,
+    e.g. {'nombre': 'Empleado', 'fecha': 'Día'}.
+    """
+
+    def __init__(self, file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 sheet: Optional[str] = None, columns: Optional[Dict[str, str]] = None):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.sheet = sheet
+        self.headers = [(columns or {}).get(name, name) for name in EXPECTED_HEADERS]
+        self.sheet_name = None
+        self.total_rows = None
+        self.rows_read = 0
+        self.content_digest = new_content_hash()
+
+    @property
+    def content_hash(self) -> str:
+        """Hash of the workbook file, available once iteration has finished"""
+        return self.content_digest.hexdigest()
+
+    @property
+    def progress(self) -> Optional[float]:
+        """Fraction of the sheet's rows read so far (0.0 - 1.0), or None if the workbook does not declare its size"""
+        if not self.total_rows:
+            return None
+        return min(self.rows_read / self.total_rows, 1.0)
+
+    def find_header(self, worksheet) -> Optional[Tuple[int, List[int]]]:
+        """(header row number, column indexes of nombre/proyecto/fecha), or None if the sheet lacks them"""
+        wanted = normalize_headers(self.headers)
+        rows = worksheet.iter_rows(max_row=HEADER_SEARCH_ROWS, values_only=True)
+        for row_number, row in enumerate(rows, start=1):
+            header = normalize_headers([cell_text(value) for value in row])
+            if all(name in header for name in wanted):
+                return row_number, [header.index(name) for name in wanted]
+        return None
+
+    def select_sheet(self, workbook):
+        """(worksheet, header row number, column indexes) of the sheet to read; sets total_rows"""
+        if self.sheet is not None:
+            if self.sheet not in workbook.sheetnames:
+                raise CSVFormatError(f"El libro no tiene la hoja '{self.sheet}'")
+            worksheets = [workbook[self.sheet]]
+        else:
+            worksheets = workbook.worksheets
+
+        for worksheet in worksheets:
+            declared_rows = worksheet.max_row
+            # Hay programas que escriben mal el tamaño de la hoja: sin él se lee hasta la última fila y columna reales
+            worksheet.reset_dimensions()
+            found = self.find_header(worksheet)
+            if found is not None:
+                header_row, columns = found
+                if declared_rows:
+                    self.total_rows = max(declared_rows - header_row, 0)
+                return worksheet, header_row, columns
+        raise CSVFormatError(f"El libro debe tener una hoja con las columnas: {', '.join(self.headers)}")
+
+    def __iter__(self) -> Iterator[List[Record]]:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            worksheet, header_row, columns = self.select_sheet(workbook)
+            self.sheet_name = worksheet.title
+
+            nombre_index, proyecto_index, fecha_index = columns
+            nombres, proyectos, fechas = [], [], []
+            rows = worksheet.iter_rows(min_row=header_row + 1, max_col=max(columns) + 1, values_only=True)
+            for row in rows:
+                if not any(value is not None and value != '' for value in row):
+                    continue  # filas vacías o solo con formato
+                nombres.append(cell_text(row[nombre_index]))
+                proyectos.append(cell_text(row[proyecto_index]))
+                fechas.append(cell_text(row[fecha_index]))
+                if len(nombres) >= self.chunk_size:
+                    yield self._chunk(nombres, proyectos, fechas)
+                    nombres, proyectos, fechas = [], [], []
+            if nombres:
+                yield self._chunk(nombres, proyectos, fechas)
+        finally:
+            workbook.close()
+
+        with open(self.file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                self.content_digest.update(block)
+
+    def _chunk(self, nombres: List[str], proyectos: List[str], fechas: List[str]) -> List[Record]:
+        chunk = make_records(nombres, proyectos, fechas)
+        self.rows_read += len(chunk)
+        return chunk
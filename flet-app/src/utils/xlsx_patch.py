@@ -0,0 +1,333 @@
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape, quoteattr
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
+from copy import copy
+from typing import Dict, List, Optional, Tuple
+import posixpath
+import shutil
+import re
+import time
+from utils.file_writer import save_atomically
+from utils.sheet_template import BUILTIN_NUMBER_FORMATS
+from utils.xlsx_writer import MAIN_NS, REL_NS, WORKSHEET_TYPE, WORKSHEET_REL
+
+OFFICE_DOCUMENT_REL = f'{REL_NS}/officeDocument'
+STYLES_REL = f'{REL_NS}/styles'
+CALC_CHAIN_REL = f'{REL_NS}/calcChain'
+
+# Orden de las secciones dentro de styles.xml
+STYLE_SECTIONS = ('numFmts', 'fonts', 'fills', 'borders', 'cellStyleXfs', 'cellXfs', 'cellStyles',
+                  'dxfs', 'tableStyles', 'colors', 'extLst')
+
+
+def upsert_sheets(file_path: str, sheets: List[Tuple[str, bytes]], styles_xml: bytes, output_path: Optional[str] = None):
+    """Add or replace worksheets by name inside an existing .xlsx
+
+    Only the package bookkeeping parts (content types, workbook, its relationships
+    and styles) are parsed and rewritten. The other worksheets are copied over as
+    opaque zip entries, so nothing has to rehydrate them. sheets holds
+    (title, worksheet xml) pairs whose style ids refer to styles_xml.
+
+    The result is written to output_path; without one, file_path is replaced
+    atomically once the new package is complete.
+    """
+    if output_path is None:
+        save_atomically(file_path, lambda temp_path: upsert_sheets(file_path, sheets, styles_xml, temp_path))
+        return
+
+    with ZipFile(file_path) as archive:
+        names = archive.namelist()
+
+        root_rels = ElementTree.fromstring(archive.read('_rels/.rels'))
+        workbook_part = next(
+            _resolve('', rel.get('Target')) for rel in root_rels
+            if rel.get('Type') == OFFICE_DOCUMENT_REL
+        )
+        workbook_dir = posixpath.dirname(workbook_part)
+        workbook_rels_part = posixpath.join(workbook_dir, '_rels', posixpath.basename(workbook_part) + '.rels')
+
+        workbook_xml = archive.read(workbook_part).decode('utf-8')
+        rels_xml = archive.read(workbook_rels_part).decode('utf-8')
+        content_types = archive.read('[Content_Types].xml').decode('utf-8')
+
+        rels = {
+            rel.get('Id'): (rel.get('Type'), _resolve(workbook_dir, rel.get('Target')))
+            for rel in ElementTree.fromstring(rels_xml)
+        }
+        styles_part = next(part for rel_type, part in rels.values() if rel_type == STYLES_REL)
+        target_styles, style_map = merge_styles(archive.read(styles_part).decode('utf-8'), styles_xml)
+
+        workbook_sheets = list(ElementTree.fromstring(workbook_xml).iter(f'{{{MAIN_NS}}}sheet'))
+        existing = {sheet.get('name'): sheet.get(f'{{{REL_NS}}}id') for sheet in workbook_sheets}
+        sheet_ids = [int(sheet.get('sheetId')) for sheet in workbook_sheets]
+
+        replaced = {styles_part: target_styles.encode('utf-8')}
+        removed = set()
+        added = []
+
+        for title, sheet_xml in sheets:
+            sheet_xml = remap_cell_styles(sheet_xml, style_map)
+
+            if title in existing:
+                # Reemplazar la parte de la hoja conservando su posición y su rId
+                part = rels[existing[title]][1]
+                replaced[part] = sheet_xml
+                removed.add(posixpath.join(posixpath.dirname(part), '_rels', posixpath.basename(part) + '.rels'))
+                continue
+
+            part = _free_part_name(names, added)
+            rel_id = _free_rel_id(rels)
+            sheet_id = max(sheet_ids, default=0) + 1
+            sheet_ids.append(sheet_id)
+            rels[rel_id] = (WORKSHEET_REL, part)
+            added.append((part, sheet_xml))
+
+            workbook_xml = _insert_before_close(workbook_xml, 'sheets', _sheet_element(workbook_xml, title, sheet_id, rel_id))
+            rels_xml = _insert_before_close(rels_xml, 'Relationships', (
+                f'<Relationship Id="{rel_id}" Type="{WORKSHEET_REL}" '
+                f'Target={quoteattr(posixpath.relpath(part, workbook_dir))}/>'
+            ))
+            content_types = _insert_before_close(content_types, 'Types', (
+                f'<Override PartName={quoteattr("/" + part)} ContentType="{WORKSHEET_TYPE}"/>'
+            ))
+
+        # The calculation chain lists formula cells of the replaced sheets; Excel rebuilds it
+        for rel_id, (rel_type, part) in list(rels.items()):
+            if rel_type == CALC_CHAIN_REL:
+                removed.add(part)
+                rels_xml = re.sub(rf'<Relationship\b[^>]*\bId="{re.escape(rel_id)}"[^>]*/>', '', rels_xml)
+                content_types = re.sub(rf'<Override\b[^>]*PartName="/{re.escape(part)}"[^>]*/>', '', content_types)
+
+        replaced[workbook_part] = workbook_xml.encode('utf-8')
+        replaced[workbook_rels_part] = rels_xml.encode('utf-8')
+        replaced['[Content_Types].xml'] = content_types.encode('utf-8')
+
+        # El paquete nuevo se escribe aparte; el original solo se lee
+        with ZipFile(output_path, 'w') as output:
+            for info in archive.infolist():
+                if info.filename in removed:
+                    continue
+                if info.filename in replaced:
+                    output.writestr(_entry_info(info), replaced[info.filename])
+                    continue
+                with archive.open(info) as source, output.open(_entry_info(info), 'w') as target:
+                    shutil.copyfileobj(source, target, 1024 * 1024)
+            for part, sheet_xml in added:
+                output.writestr(_entry_info(part), sheet_xml)
+
+
+def merge_styles(target_xml: str, source_xml: bytes) -> Tuple[str, Dict[int, int]]:
+    """Append the source cell formats to the target styles part
+
+    Fonts, fills, borders, number formats and cell formats that already exist
+    in the target are reused, so updating the same file again does not grow it.
+    Returns the new styles xml and a {source xf id: target xf id} map.
+    """
+    target = ElementTree.fromstring(target_xml)
+    source = ElementTree.fromstring(source_xml)
+
+    # Custom number formats are matched by format code
+    number_formats = {}
+    target_formats = {fmt.get('formatCode'): int(fmt.get('numFmtId')) for fmt in _children(target, 'numFmts')}
+    next_format = max([BUILTIN_NUMBER_FORMATS - 1, *target_formats.values()]) + 1
+    new_formats = []
+    for fmt in _children(source, 'numFmts'):
+        code = fmt.get('formatCode')
+        if code not in target_formats:
+            target_formats[code] = next_format
+            new_formats.append(f'<numFmt numFmtId="{next_format}" formatCode={quoteattr(code)}/>')
+            next_format += 1
+        number_formats[int(fmt.get('numFmtId'))] = target_formats[code]
+    if new_formats:
+        target_xml = _append_children(target_xml, 'numFmts', new_formats, len(target_formats))
+
+    target_xml, fonts = _merge_section(target_xml, target, source, 'fonts')
+    target_xml, fills = _merge_section(target_xml, target, source, 'fills')
+    target_xml, borders = _merge_section(target_xml, target, source, 'borders')
+
+    def remap(xf, named_styles=None):
+        xf = copy(xf)
+        xf.set('fontId', str(fonts.get(int(xf.get('fontId', 0)), 0)))
+        xf.set('fillId', str(fills.get(int(xf.get('fillId', 0)), 0)))
+        xf.set('borderId', str(borders.get(int(xf.get('borderId', 0)), 0)))
+        number_format = int(xf.get('numFmtId', 0))
+        xf.set('numFmtId', str(number_formats.get(number_format, number_format)))
+        if named_styles is not None:
+            xf.set('xfId', str(named_styles.get(int(xf.get('xfId', 0)), 0)))
+        return xf
+
+    # Named styles are matched by built-in id (names of built-ins are localized) or by name;
+    # unknown ones are added together with their base format
+    target_names = {}
+    for style in _children(target, 'cellStyles'):
+        target_names[style.get('name')] = int(style.get('xfId', 0))
+        if style.get('builtinId') is not None:
+            target_names[('builtin', style.get('builtinId'))] = int(style.get('xfId', 0))
+    style_xfs = _children(source, 'cellStyleXfs')
+    named_styles = {}
+    new_style_xfs = []
+    new_cell_styles = []
+    next_style_xf = len(_children(target, 'cellStyleXfs'))
+    for style in _children(source, 'cellStyles'):
+        name = style.get('name')
+        xf_id = int(style.get('xfId', 0))
+        key = ('builtin', style.get('builtinId')) if style.get('builtinId') is not None else name
+        if key in target_names:
+            named_styles[xf_id] = target_names[key]
+            continue
+        new_style_xfs.append(_serialize(remap(style_xfs[xf_id])))
+        new_style = copy(style)
+        new_style.set('xfId', str(next_style_xf))
+        new_cell_styles.append(_serialize(new_style))
+        named_styles[xf_id] = target_names[key] = next_style_xf
+        next_style_xf += 1
+    if new_style_xfs:
+        style_count = len(_children(target, 'cellStyles')) + len(new_cell_styles)
+        target_xml = _append_children(target_xml, 'cellStyleXfs', new_style_xfs, next_style_xf)
+        target_xml = _append_children(target_xml, 'cellStyles', new_cell_styles, style_count)
+
+    target_xml, cell_formats = _merge_section(
+        target_xml, target, source, 'cellXfs',
+        transform=lambda xf: remap(xf, named_styles)
+    )
+    return target_xml, cell_formats
+
+
+def remap_cell_styles(sheet_xml: bytes, style_map: Dict[int, int]) -> bytes:
+    """Rewrite the s="n" attribute of every cell through style_map"""
+    return re.sub(
+        rb'(<c r="[A-Z]+[0-9]+") s="([0-9]+)"',
+        lambda match: b'%s s="%d"' % (match.group(1), style_map.get(int(match.group(2)), 0)),
+        sheet_xml
+    )
+
+
+def _merge_section(target_xml: str, target, source, tag: str, transform=None) -> Tuple[str, Dict[int, int]]:
+    """Append the source children of a styles section that the target lacks"""
+    target_children = _children(target, tag)
+    known = {}
+    for index, child in enumerate(target_children):
+        known.setdefault(_serialize(child), index)
+
+    mapping = {}
+    additions = []
+    count = len(target_children)
+    for index, child in enumerate(_children(source, tag)):
+        if transform:
+            child = transform(child)
+        key = _serialize(child)
+        if key not in known:
+            known[key] = count
+            additions.append(key)
+            count += 1
+        mapping[index] = known[key]
+
+    if additions:
+        target_xml = _append_children(target_xml, tag, additions, count)
+    return target_xml, mapping
+
+
+def _append_children(xml: str, tag: str, children: List[str], count: int) -> str:
+    """Append serialized children to a styles section and update its count"""
+    match = re.search(rf'<{tag}\b([^>]*?)(/?)>', xml)
+    if match is None:
+        # Section missing: create it in front of the next section that exists
+        section = f'<{tag} count="{count}">{"".join(children)}</{tag}>'
+        for following in STYLE_SECTIONS[STYLE_SECTIONS.index(tag) + 1:]:
+            position = re.search(rf'<{following}\b', xml)
+            if position:
+                return xml[:position.start()] + section + xml[position.start():]
+        return _insert_before_close(xml, 'styleSheet', section)
+
+    attributes = re.sub(r'\s*count="[0-9]*"', '', match.group(1))
+    opening = f'<{tag} count="{count}"{attributes}>'
+    if match.group(2):
+        return xml[:match.start()] + opening + ''.join(children) + f'</{tag}>' + xml[match.end():]
+    close = xml.index(f'</{tag}>', match.end())
+    return xml[:match.start()] + opening + xml[match.end():close] + ''.join(children) + xml[close:]
+
+
+def _insert_before_close(xml: str, tag: str, fragment: str) -> str:
+    """Insert fragment right before </tag> (expanding <tag/> when needed)"""
+    close = xml.rfind(f'</{tag}>')
+    if close != -1:
+        return xml[:close] + fragment + xml[close:]
+    match = re.search(rf'<{tag}\b([^>]*?)/>', xml)
+    return xml[:match.start()] + f'<{tag}{match.group(1)}>{fragment}</{tag}>' + xml[match.end():]
+
+
+def _sheet_element(workbook_xml: str, title: str, sheet_id: int, rel_id: str) -> str:
+    """<sheet> element using the workbook's own prefix for the relationships namespace"""
+    match = re.search(rf'xmlns:(\w+)="{re.escape(REL_NS)}"', workbook_xml)
+    if match:
+        return f'<sheet name={quoteattr(title)} sheetId="{sheet_id}" {match.group(1)}:id="{rel_id}"/>'
+    return f'<sheet xmlns:r="{REL_NS}" name={quoteattr(title)} sheetId="{sheet_id}" r:id="{rel_id}"/>'
+
+
+def _children(root, tag: str) -> list:
+    section = root.find(f'{{{MAIN_NS}}}{tag}')
+    return list(section) if section is not None else []
+
+
+def _serialize(element) -> str:
+    """Serialize a styles element for a document whose default namespace is the main one
+
+    Also used as the comparison key to reuse formats the target already has.
+    """
+    declarations = {}
+
+    def name(qname: str) -> str:
+        if not qname.startswith('{'):
+            return qname
+        uri, local = qname[1:].split('}', 1)
+        if uri == MAIN_NS:
+            return local
+        prefix = declarations.setdefault(uri, f'ns{len(declarations) + 1}')
+        return f'{prefix}:{local}'
+
+    def render(el) -> str:
+        attributes = ''.join(f' {name(key)}={quoteattr(value)}' for key, value in el.attrib.items())
+        content = escape(el.text or '') + ''.join(render(child) for child in el)
+        tag = name(el.tag)
+        if content:
+            return f'<{tag}{attributes}>{content}</{tag}>'
+        return f'<{tag}{attributes}/>'
+
+    xml = render(element)
+    if declarations:
+        tag_end = len(name(element.tag)) + 1
+        namespaces = ''.join(f' xmlns:{prefix}={quoteattr(uri)}' for uri, prefix in declarations.items())
+        xml = xml[:tag_end] + namespaces + xml[tag_end:]
+    return xml
+
+
+def _resolve(base_dir: str, target: str) -> str:
+    """Package part name for a relationship target"""
+    if target.startswith('/'):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(base_dir, target))
+
+
+def _free_part_name(names: List[str], added: List[Tuple[str, bytes]]) -> str:
+    used = set(names) | {part for part, _ in added}
+    index = 1
+    while f'xl/worksheets/sheet{index}.xml' in used:
+        index += 1
+    return f'xl/worksheets/sheet{index}.xml'
+
+
+def _free_rel_id(rels: Dict) -> str:
+    index = len(rels) + 1
+    while f'rId{index}' in rels:
+        index += 1
+    return f'rId{index}'
+
+
+def _entry_info(entry):
+    """Fresh deflated ZipInfo for a part, keeping the original timestamp when there is one"""
+    if isinstance(entry, ZipInfo):
+        info = ZipInfo(entry.filename, date_time=entry.date_time)
+    else:
+        info = ZipInfo(entry, date_time=time.localtime()[:6])
+    info.compress_type = ZIP_DEFLATED
+    return info
@@ -0,0 +1,231 @@
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.writer.theme import theme_xml
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape, quoteattr
+from zipfile import ZipFile, ZIP_DEFLATED
+from io import BytesIO
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numbers
+import re
+from utils.sheet_template import get_template
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+WORKSHEET_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+WORKSHEET_REL = f'{REL_NS}/worksheet'
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+CONTENT_TYPES = (
+    XML_DECLARATION +
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/theme/theme1.xml" ContentType="application/vnd.openxmlformats-officedocument.theme+xml"/>'
+    '{sheets}</Types>'
+)
+
+ROOT_RELS = (
+    XML_DECLARATION +
+    f'<Relationships xmlns="{PACKAGE_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK = (
+    XML_DECLARATION +
+    f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+    '<bookViews><workbookView activeTab="0"/></bookViews>'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+
+WORKBOOK_RELS = (
+    XML_DECLARATION +
+    f'<Relationships xmlns="{PACKAGE_REL_NS}">'
+    '{sheets}'
+    f'<Relationship Id="rId{{styles_id}}" Type="{REL_NS}/styles" Target="styles.xml"/>'
+    f'<Relationship Id="rId{{theme_id}}" Type="{REL_NS}/theme" Target="theme/theme1.xml"/>'
+    '</Relationships>'
+)
+
+
+# Excel: como máximo 31 caracteres y sin []:*?/\ en el nombre de una hoja
+MAX_SHEET_TITLE = 31
+INVALID_TITLE_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+def sheet_title(name: str, used: set) -> str:
+    """Valid, unique sheet title for name; the title is added to used"""
+    base = INVALID_TITLE_CHARS.sub('_', name).strip("'") or 'Hoja'
+    title = base[:MAX_SHEET_TITLE]
+    counter = 2
+    while title.lower() in used:
+        suffix = f" ({counter})"
+        title = base[:MAX_SHEET_TITLE - len(suffix)] + suffix
+        counter += 1
+    used.add(title.lower())
+    return title
+
+
+def cell_xml(coordinate: str, style_id: int, value) -> str:
+    """Serialize one <c> element; strings are written inline so no shared string table is needed"""
+    style = f' s="{style_id}"' if style_id else ''
+
+    if value is None or value == '':
+        return f'<c r="{coordinate}"{style}/>'
+    if isinstance(value, bool):
+        return f'<c r="{coordinate}"{style} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Integral):
+        return f'<c r="{coordinate}"{style}><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Real):
+        return f'<c r="{coordinate}"{style}><v>{float(value)!r}</v></c>'
+
+    value = str(value)
+    if value.startswith('=') and len(value) > 1:
+        return f'<c r="{coordinate}"{style}><f>{escape(value[1:])}</f></c>'
+    return f'<c r="{coordinate}"{style} t="inlineStr"><is><t xml:space="preserve">{escape(value)}</t></is></c>'
+
+
+class XlsxStreamWriter:
+    """Write template-based workbooks directly as SpreadsheetML into a zip stream
+
+    openpyxl serializes the template once; its styles part, the sheet head/tail
+    (columns, merges, A4 page setup) and the style id of every template cell are
+    reused verbatim, so each new file only costs the string formatting of its
+    rows plus the deflate of a few small parts.
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+        wb = Workbook()
+        wb.remove(wb.active)
+        template.render(wb, 'Plantilla')
+        buffer = BytesIO()
+        wb.save(buffer)
+
+        with ZipFile(buffer) as archive:
+            self.styles_xml = archive.read('xl/styles.xml')
+            sheet_xml = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+
+        # Everything around <sheetData> is the same for every sheet
+        start = sheet_xml.index('<sheetData')
+        end = sheet_xml.find('</sheetData>')
+        if end == -1:
+            end = sheet_xml.index('/>', start) + len('/>')
+        else:
+            end += len('</sheetData>')
+        self.head = re.sub(r' tabSelected="1"', '', sheet_xml[:start])
+        self.tail = sheet_xml[end:]
+
+        self.style_ids = {}
+        self.row_attributes = {}
+        root = ElementTree.fromstring(sheet_xml)
+        for row in root.iter(f'{{{MAIN_NS}}}row'):
+            attributes = ''.join(
+                f' {key}={quoteattr(value)}' for key, value in row.attrib.items()
+                if key in ('ht', 'customHeight', 'hidden')
+            )
+            self.row_attributes[int(row.get('r'))] = attributes
+            for cell in row.iter(f'{{{MAIN_NS}}}c'):
+                self.style_ids[cell.get('r')] = int(cell.get('s', 0))
+
+        # Precompiled XML of every template cell, grouped by row
+        self.rows = {}
+        for row, column, value, _ in template.cells:
+            coordinate = f'{get_column_letter(column)}{row}'
+            self.rows.setdefault(row, {})[column] = cell_xml(coordinate, self.style_ids.get(coordinate, 0), value)
+
+    def sheet_xml(self, values: Dict[Tuple[int, int], object]) -> bytes:
+        """Worksheet part for the template with the given data cells"""
+        data_rows = {}
+        for (row, column), value in values.items():
+            coordinate = f'{get_column_letter(column)}{row}'
+            data_rows.setdefault(row, {})[column] = cell_xml(coordinate, self.style_ids.get(coordinate, 0), value)
+
+        parts = [self.head, '<sheetData>']
+        for row in sorted(set(self.rows) | set(data_rows) | set(self.row_attributes)):
+            cells = self.rows.get(row, {})
+            if row in data_rows:
+                cells = {**cells, **data_rows[row]}
+            parts.append(f'<row r="{row}"{self.row_attributes.get(row, "")}>')
+            parts.extend(cells[column] for column in sorted(cells))
+            parts.append('</row>')
+        parts.append('</sheetData>')
+        parts.append(self.tail)
+        return ''.join(parts).encode('utf-8')
+
+    def plain_sheet_xml(self, values: Dict[Tuple[int, int], object], cell_styles: Dict[Tuple[int, int], int],
+                        column_widths: Dict[int, float], selected: bool = False) -> bytes:
+        """Worksheet part that does not follow the template, styled with the template's style ids"""
+        rows = {}
+        for (row, column), value in values.items():
+            coordinate = f'{get_column_letter(column)}{row}'
+            rows.setdefault(row, {})[column] = cell_xml(coordinate, cell_styles.get((row, column), 0), value)
+
+        tab_selected = ' tabSelected="1"' if selected else ''
+        parts = [
+            XML_DECLARATION,
+            f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">',
+            f'<sheetViews><sheetView{tab_selected} workbookViewId="0">',
+            '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>',
+            '</sheetView></sheetViews>',
+            '<sheetFormatPr baseColWidth="8" defaultRowHeight="15"/>',
+        ]
+        if column_widths:
+            parts.append('<cols>')
+            parts.extend(
+                f'<col min="{column}" max="{column}" width="{width}" customWidth="1"/>'
+                for column, width in sorted(column_widths.items())
+            )
+            parts.append('</cols>')
+        parts.append('<sheetData>')
+        for row in sorted(rows):
+            parts.append(f'<row r="{row}">')
+            parts.extend(rows[row][column] for column in sorted(rows[row]))
+            parts.append('</row>')
+        parts.append('</sheetData></worksheet>')
+        return ''.join(parts).encode('utf-8')
+
+    def write(self, target, sheets: List[Tuple[str, object]]):
+        """Write a new workbook with one sheet per (title, values) to a path or file object
+
+        values is either the data cells of a template sheet or an already
+        serialized worksheet part (bytes), e.g. from plain_sheet_xml().
+        """
+        content_types = []
+        workbook_sheets = []
+        workbook_rels = []
+        for index, (title, _) in enumerate(sheets, 1):
+            content_types.append(f'<Override PartName="/xl/worksheets/sheet{index}.xml" ContentType="{WORKSHEET_TYPE}"/>')
+            workbook_sheets.append(f'<sheet name={quoteattr(title)} sheetId="{index}" r:id="rId{index}"/>')
+            workbook_rels.append(f'<Relationship Id="rId{index}" Type="{WORKSHEET_REL}" Target="worksheets/sheet{index}.xml"/>')
+
+        with ZipFile(target, 'w', ZIP_DEFLATED) as archive:
+            archive.writestr('[Content_Types].xml', CONTENT_TYPES.format(sheets=''.join(content_types)))
+            archive.writestr('_rels/.rels', ROOT_RELS)
+            archive.writestr('xl/workbook.xml', WORKBOOK.format(sheets=''.join(workbook_sheets)))
+            archive.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS.format(
+                sheets=''.join(workbook_rels),
+                styles_id=len(sheets) + 1,
+                theme_id=len(sheets) + 2
+            ))
+            archive.writestr('xl/styles.xml', self.styles_xml)
+            archive.writestr('xl/theme/theme1.xml', theme_xml)
+
+            # Las hojas se generan y comprimen de una en una
+            for index, (_, values) in enumerate(sheets, 1):
+                sheet_xml = values if isinstance(values, bytes) else self.sheet_xml(values)
+                archive.writestr(f'xl/worksheets/sheet{index}.xml', sheet_xml)
+
+
+@lru_cache(maxsize=None)
+def get_stream_writer(template_path: Optional[str] = None) -> XlsxStreamWriter:
+    """Return the process-wide stream writer for template_path"""
+    return XlsxStreamWriter(get_template(template_path))
@@ -1,10 +1,12 @@
 import flet as ft
 from components.csvselectorcomponent import CSVSelectorComponent
 from components.excel_generator_component import ExcelGeneratorUI
+from utils.dataset import PayrollDataset
+from utils.ui_scheduler import request_update
 
 class CSVView:
     def __init__(self):
-        self.loaded_data = []
+        self.loaded_data = PayrollDataset([])
         self.csv_selector = None
         self.excel_generator_ui = None
         self.stats_text = None
@@ -68,12 +70,10 @@ class CSVView:
             vertical_alignment=ft.CrossAxisAlignment.START)
         ], scroll=ft.ScrollMode.AUTO)
     
-    def on_csv_loaded(self, data):
+    def on_csv_loaded(self, data: PayrollDataset):
         self.loaded_data = data
-        unique_names = len(set(row['nombre'] for row in data))
-        unique_projects = len(set(row['proyecto'] for row in data))
         
-        self.stats_text.value = f"✅ Datos cargados: {len(data)} registros, {unique_names} personas, {unique_projects} proyectos"
+        self.stats_text.value = f"✅ Datos cargados: {len(data)} registros, {data.employee_count} personas, {data.project_count} proyectos"
         self.stats_text.visible = True
         self.stats_text.color = "#4CAF50"
         
@@ -82,11 +82,16 @@ class CSVView:
             self.excel_generator_ui.set_csv_data(data)
         
         if self.page:
-            self.page.update()
+            request_update(self.page)
     
     def set_page(self, page):
         self.page = page
         if self.csv_selector:
             self.csv_selector.set_page(page)
         if self.excel_generator_ui:
-            self.excel_generator_ui.set_page(page)
\ No newline at end of file
+            self.excel_generator_ui.set_page(page)
+    
+    def warm_up(self):
+        """Preload the generator dependencies without blocking the first frame"""
+        if self.excel_generator_ui:
+            self.excel_generator_ui.warm_up()
@@ -0,0 +1,58 @@
+import os
+import threading
+from multiprocessing import get_context
+
+from utils.csv_cache import CSVCache
+from utils.records import Record
+
+
+def write_csv(path, employee):
+    path.write_text(f"nombre,proyecto,fecha\n{employee},P001 - Obra,01/01/2024\n", encoding='utf-8')
+    return [Record(employee, 'P001 - Obra', '01/01/2024')]
+
+
+def store_files(cache_dir, paths):
+    cache = CSVCache(cache_dir)
+    for path in paths:
+        cache.store(path, [Record(os.path.basename(path), 'P001 - Obra', '01/01/2024')])
+
+
+def test_writers_in_other_processes_and_threads_merge_their_entries(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    paths = []
+    for number in range(24):
+        path = tmp_path / f"E{number}.csv"
+        write_csv(path, f"E{number}")
+        paths.append(str(path))
+
+    # Una instancia abierta antes que los demás escritores no debe borrar sus entradas al guardar
+    early = CSVCache(cache_dir)
+    processes = [get_context('spawn').Process(target=store_files, args=(cache_dir, paths[i::3])) for i in range(2)]
+    for process in processes:
+        process.start()
+    threads = [threading.Thread(target=early.store, args=(path, [Record('x', 'y', 'z')])) for path in paths[2::3]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    cache = CSVCache(cache_dir)
+    assert len(cache.index['entries']) == len(paths)
+    assert all(cache.load(path) is not None for path in paths)
+
+
+def test_eviction_removes_pickles_missing_from_the_index(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    orphan = cache_dir / ('0' * 32 + '.pickle')
+    orphan.write_bytes(b'x' * 1024)
+
+    path = tmp_path / 'a.csv'
+    records = write_csv(path, 'ANA')
+    CSVCache(str(cache_dir)).store(str(path), records)
+
+    assert not orphan.exists()
+    assert CSVCache(str(cache_dir)).load(str(path)) == records
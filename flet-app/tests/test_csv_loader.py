@@ -0,0 +1,28 @@
+import pytest
+
+from utils.csv_engines import SNIFF_BYTES, engine_available
+from utils.csv_loader import CSVChunkLoader
+
+
+def write_late_cp1252_csv(path):
+    """Windows-1252 export whose first non-ASCII byte lies past the sniffed block"""
+    filler = b'ANA GARCIA,P001 - Obra,01/01/2025\r\n'
+    rows = filler * (SNIFF_BYTES // len(filler) + 10)
+    tail = 'JOSÉ PÉREZ,P002 - Año,02/01/2025\r\n'.encode('cp1252')
+    path.write_bytes(b'nombre,proyecto,fecha\r\n' + rows + tail)
+    assert rows.isascii() and len(rows) > SNIFF_BYTES
+    return rows.count(b'\n') + 1
+
+
+@pytest.mark.parametrize('engine', ['stdlib', 'pandas'])
+def test_cp1252_bytes_past_sniffed_block(tmp_path, engine):
+    if not engine_available(engine):
+        pytest.skip(f"{engine} no está instalado")
+    path = tmp_path / 'late_cp1252.csv'
+    expected_rows = write_late_cp1252_csv(path)
+
+    records = [record for chunk in CSVChunkLoader(str(path), engine=engine) for record in chunk]
+
+    assert len(records) == expected_rows
+    assert tuple(records[-1]) == ('JOSÉ PÉREZ', 'P002 - Año', '02/01/2025')
+    assert tuple(records[0]) == ('ANA GARCIA', 'P001 - Obra', '01/01/2025')
@@ -0,0 +1,47 @@
+from openpyxl import load_workbook
+
+from utils.excel_generator import ExcelGenerator
+from utils.records import Record
+
+
+def test_names_differing_in_case_share_one_workbook_with_workers(tmp_path):
+    records = [
+        Record('Juan Pérez', 'P001 - Obra', '04/03/2024'),
+        Record('JUAN PÉREZ', 'P002 - Nave', '08/04/2024'),
+        Record('Ana Ruiz', 'P001 - Obra', '05/03/2024'),
+    ]
+    generator = ExcelGenerator()
+
+    files = generator.generate_excel_files(records, str(tmp_path), 10.0, workers=2, incremental=False)
+
+    assert generator.errors == []
+    assert sorted(files) == sorted({str(tmp_path / 'JUAN_PÉREZ_GASTOS_2024.xlsx'),
+                                    str(tmp_path / 'ANA_RUIZ_GASTOS_2024.xlsx')})
+    workbook = load_workbook(tmp_path / 'JUAN_PÉREZ_GASTOS_2024.xlsx', read_only=True)
+    assert workbook.sheetnames == ['Marzo_2024', 'Abril_2024']
+    workbook.close()
+
+    # Los dos meses quedan en el manifiesto: una ejecución incremental no reescribe nada
+    generator.generate_excel_files(records, str(tmp_path), 10.0, workers=2)
+    assert generator.skipped_sheets == 3
+
+
+def test_generated_workbook_as_template_brings_no_data(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    worked_every_day = [Record('LLENO', 'P001 - Obra', f'{day:02d}/01/2024') for day in range(1, 32)]
+    ExcelGenerator().generate_excel_files(worked_every_day, str(source), 10.0)
+
+    for backend in ('standard', 'streaming'):
+        output = tmp_path / backend
+        output.mkdir()
+        generator = ExcelGenerator(template_path=str(source / 'LLENO_GASTOS_2024.xlsx'), backend=backend)
+        generator.generate_excel_files([Record('Otra', 'P002 - Nave', '05/02/2024')], str(output), 12.0)
+
+        worksheet = load_workbook(output / 'OTRA_GASTOS_2024.xlsx').worksheets[0]
+        assert (worksheet['C2'].value, worksheet['F2'].value) == ('OTRA', 12)
+        assert worksheet['B10'].value == '=$F$2'
+        # Días no trabajados: sin los datos de la plantilla, pero con su formato
+        assert [worksheet[f'B{row}'].value for row in (6, 8, 36)] == [None, None, None]
+        assert worksheet['G8'].value is None
+        assert worksheet['A8'].value == 3